@@ -1,41 +1,214 @@
-import random
+"""
+Deploys superlists as versioned releases.
 
-from fabric.contrib.files import append, exists
-from fabric.api import cd, env, local, run
+Each deploy builds one release locally: the source of the current commit,
+the wheels of every dependency and the collected static files. The release
+is shipped to every host in parallel and unpacked into its own folder under
+`releases/`. Once its virtualenv is installed from the shipped wheels on
+every host, the first host migrates the database. Then the `current` symlink
+of every host is switched to it and gunicorn reloads its workers, so the site
+never serves a half-updated release.
 
-REPO_URL = "https://github.com/fbidu/superlists.git"
+    fab -H ubuntu@example.com deploy
+    fab localhost deploy
+"""
+import getpass
+import os
+import time
+
+from fabric.api import (
+    cd,
+    env,
+    execute,
+    local,
+    parallel,
+    put,
+    run,
+    runs_once,
+    sudo,
+    task,
+)
+from fabric.contrib.files import exists
+from fabric.utils import puts
+
+KEEP_RELEASES = 5
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUILD_FOLDER = os.path.join(PROJECT_ROOT, "build")
+
+# Files that must survive across releases
+SHARED_FILES = ("db.sqlite3", "ratelimit.sqlite3")
+
+
+def _site_folder():
+    return f"/home/{env.user}/django-apps/{env.host}"
+
+
+def _build_release():
+    """
+    Builds the release archive of the current commit on this machine
+    """
+    commit = local("git log -n 1 --format=%H", capture=True)
+    release = f"{time.strftime('%Y%m%d%H%M%S')}-{commit[:8]}"
+    build = os.path.join(BUILD_FOLDER, release)
+    local(f"mkdir -p {build}/wheels")
+
+    local(f"git archive {commit} superlists Pipfile.lock | tar -x -C {build}")
+    # Goes into the ETags of the pages, see RELEASE in the settings
+    local(f"echo {release} > {build}/superlists/RELEASE")
+    local(f"cd {PROJECT_ROOT} && pipenv lock -r > {build}/requirements.txt")
+    local(f"pip wheel -r {build}/requirements.txt -w {build}/wheels")
+    # STATIC_ROOT is the static folder next to the project
+    local(f"cd {build}/superlists && python manage.py collectstatic --noinput")
+    # Precompressed copies for the gzip_static of nginx
+    local(
+        f"find {build}/static -type f "
+        r"\( -name '*.css' -o -name '*.js' -o -name '*.svg' \) -exec gzip -9 -k {} +"
+    )
+
+    archive = f"{build}.tar.gz"
+    local(f"tar -czf {archive} -C {build} .")
+    return release, archive
 
-def _get_latest_source():
-    if exists(".git"):
-        run("git fetch")
-    else:
-        run(f"git clone {REPO_URL} .")
-        current_commit = local("git log -n 1 --format=%H", capture=True)
-        run(f"git reset --hard {current_commit}")
 
-def _update_pipenv():
-    if not exists(f"/home/{env.user}/miniconda3/bin/pipenv"):
-        run(f"pip install --user pipenv")
+def _upload_release(release, archive):
+    releases = f"{_site_folder()}/releases"
+    run(f"mkdir -p {releases}/{release}")
+    put(archive, f"{releases}/{release}.tar.gz")
+    run(f"tar -xzf {releases}/{release}.tar.gz -C {releases}/{release}")
+    run(f"rm {releases}/{release}.tar.gz")
+
+
+def _install_virtualenv(release_folder):
+    with cd(release_folder):
+        run(f"/home/{env.user}/miniconda3/bin/python3 -m venv venv")
+        # Everything comes from the shipped wheels, nothing from the network
+        run("venv/bin/pip install --no-index --find-links wheels -r requirements.txt")
+
+
+def _link_shared_files(release_folder):
+    shared = f"{_site_folder()}/shared"
+    run(f"mkdir -p {shared}")
+    for name in SHARED_FILES:
+        # Sites deployed before releases existed kept the database in place
+        old_copy = f"{_site_folder()}/superlists/{name}"
+        if not exists(f"{shared}/{name}") and exists(old_copy):
+            run(f"cp {old_copy} {shared}/{name}")
+        run(f"ln -sfn {shared}/{name} {release_folder}/superlists/{name}")
 
-    run(f"/home/{env.user}/miniconda3/bin/pipenv install")
 
 def _update_dotenv():
     pass
 
-def _update_static_files():
-    run(f"/home/{env.user}/miniconda3/bin/pipenv run python manage.py collectstatic --noinput")
 
-def _update_database():
-    run(f"/home/{env.user}/miniconda3/bin/pipenv run python manage.py migrate --noinput")
+def _update_database(release_folder):
+    with cd(f"{release_folder}/superlists"):
+        run("../venv/bin/python manage.py migrate --noinput")
 
-def deploy():
-    site_folder = f"/home/{env.user}/django-apps/{env.host}"
-    run(f"mkdir -p {site_folder}")
-    with cd(site_folder):
-        _get_latest_source()
 
-    with cd(f"{site_folder}/superlists"):
-        _update_pipenv()
+def _switch_current(release_folder):
+    site_folder = _site_folder()
+    # mv -T renames over the old symlink in one step, unlike ln -sfn
+    run(f"ln -sfn {release_folder} {site_folder}/current.new")
+    run(f"mv -Tf {site_folder}/current.new {site_folder}/current")
+
+
+def _reload_gunicorn(previous_folder, release_folder):
+    service = f"gunicorn-{env.host}"
+    # HUP replaces the workers gracefully, but they keep the interpreter
+    # and packages of the running master, so new dependencies need a restart
+    same_dependencies = (
+        previous_folder
+        and run(
+            f"cmp -s {previous_folder}/requirements.txt "
+            f"{release_folder}/requirements.txt",
+            warn_only=True,
+        ).succeeded
+    )
+    if same_dependencies:
+        sudo(f"systemctl reload {service}")
+    else:
+        sudo(f"systemctl restart {service}")
+
+
+def _restart_workers():
+    # The task workers stop between tasks and start again from `current`
+    sudo(f"systemctl restart tasks-{env.host}")
+
+
+def _prune_releases():
+    with cd(f"{_site_folder()}/releases"):
+        run(f"ls -1t | tail -n +{KEEP_RELEASES + 1} | xargs -r rm -rf")
+
+
+@parallel
+def _prepare_release(release, archive):
+    release_folder = f"{_site_folder()}/releases/{release}"
+    _upload_release(release, archive)
+    _install_virtualenv(release_folder)
+    _link_shared_files(release_folder)
+    with cd(f"{release_folder}/superlists"):
         _update_dotenv()
-        _update_static_files()
-        _update_database()
\ No newline at end of file
+
+
+def _migrate_release(release):
+    _update_database(f"{_site_folder()}/releases/{release}")
+
+
+@parallel
+def _activate_release(release):
+    release_folder = f"{_site_folder()}/releases/{release}"
+    current = f"{_site_folder()}/current"
+    previous_folder = exists(current) and run(f"readlink -f {current}")
+
+    _switch_current(release_folder)
+    _reload_gunicorn(previous_folder, release_folder)
+    _restart_workers()
+    _prune_releases()
+
+
+@task
+def localhost():
+    """
+    Deploys to this machine, through ssh, to try out the deploy
+    """
+    env.hosts = ["localhost"]
+    env.user = getpass.getuser()
+
+
+@task
+@runs_once
+def deploy():
+    """
+    Builds a release once, installs it on every host in parallel, migrates
+    the databases from the first host, then switches every host to it
+    """
+    release, archive = _build_release()
+    execute(_prepare_release, release, archive)
+    # The hosts share their databases, so one of them migrates them, before
+    # any host switches to the new code
+    execute(_migrate_release, release, hosts=env.hosts[:1])
+    execute(_activate_release, release)
+
+
+@task
+def rollback():
+    """
+    Points `current` back to the release before it
+    """
+    with cd(f"{_site_folder()}/releases"):
+        current = run(f"basename $(readlink -f {_site_folder()}/current)")
+        previous = run(f"ls -1t | grep -A1 -x {current} | tail -n 1")
+    if previous == current:
+        puts("There is no release before the current one")
+        return
+    _switch_current(f"{_site_folder()}/releases/{previous}")
+    sudo(f"systemctl restart gunicorn-{env.host}")
+
+
+@task
+def migration_progress():
+    """
+    Shows how far the backfills of the online migrations got
+    """
+    with cd(f"{_site_folder()}/current/superlists"):
+        run("../venv/bin/python manage.py migration_progress")
@@ -5,65 +5,125 @@ import os
 import time
 
 from django.contrib.staticfiles.testing import StaticLiveServerTestCase
-from selenium import webdriver
 from selenium.common.exceptions import WebDriverException
 
+from .browsers import pool
+
 MAX_WAIT = 10
+# The waits poll quickly at first, then back off up to MAX_POLL_INTERVAL
+POLL_INTERVAL = 0.01
+MAX_POLL_INTERVAL = 0.5
+
+# Resolves as soon as a row with the given text shows up in the list table,
+# watching the page for changes instead of polling it
+WAIT_FOR_ROW_SCRIPT = """
+var rowText = arguments[0];
+var done = arguments[arguments.length - 1];
+
+function hasRow() {
+    var table = document.getElementById("id_list_table");
+    if (!table) {
+        return false;
+    }
+    return Array.prototype.some.call(table.rows, function (row) {
+        return row.innerText.trim() === rowText;
+    });
+}
+
+if (hasRow()) {
+    done(true);
+} else {
+    var observer = new MutationObserver(function () {
+        if (hasRow()) {
+            observer.disconnect();
+            done(true);
+        }
+    });
+    observer.observe(document, {childList: true, subtree: true, characterData: true});
+}
+"""
+
+
+def poll_intervals():
+    """
+    Yields how long to sleep between the tries of a wait, doubling up to
+    MAX_POLL_INTERVAL, until MAX_WAIT has passed
+    """
+    deadline = time.time() + MAX_WAIT
+    interval = POLL_INTERVAL
+    while time.time() < deadline:
+        yield min(interval, max(deadline - time.time(), 0))
+        interval = min(interval * 2, MAX_POLL_INTERVAL)
 
 
 class FunctionalTests(StaticLiveServerTestCase):
     """
     Base class for functional testing
+
+    Run them in parallel with
+
+        python manage.py test functional_tests --parallel
+
+    Every process gets its own live server, its own copy of the test
+    database and its own pool of browsers.
     """
 
     def setUp(self):
         """
         setUp starts up our environment before running the tests
         """
-        # Defines the browser engine we're going to use
-        self.browser = webdriver.Firefox()
+        # Borrows a browser from the pool of this process
+        self.browser = pool.acquire()
         staging_server = os.environ.get("STAGING_SERVER")
         if staging_server:
             self.live_server_url = f"http://{staging_server}"
 
-        self.browser.implicitly_wait(3)
+        self.browser.implicitly_wait(0)
+        self.browser.set_script_timeout(MAX_WAIT)
 
     def tearDown(self):
         """
         cleans up ou environment after the tests
         """
-        # Closes the browser
-        self.browser.quit()
+        # Gives the browser back to the pool, clean
+        pool.release(self.browser)
+
+    def restart_browser(self):
+        """
+        Makes the browser look like a brand new visitor's
+        """
+        pool.release(self.browser)
+        self.browser = pool.acquire()
 
     # pylint: disable=invalid-name
     def wait_for(self, fn):
         """
         Helper function that waits until a given callable is called
         """
-        start_time = time.time()
-        while True:
+        for interval in poll_intervals():
             try:
                 return fn()
-            except (AssertionError, WebDriverException) as e:
-                if time.time() - start_time > MAX_WAIT:
-                    raise e
-                time.sleep(0.5)
+            except (AssertionError, WebDriverException):
+                time.sleep(interval)
+        # One last try, which raises what went wrong
+        return fn()
 
     def wait_for_row_in_list_table(self, row_text):
         """
         waits until a given info appears in the list table
         """
-        start_time = time.time()
-        while True:
+        for interval in poll_intervals():
             try:
-                table = self.browser.find_element_by_id("id_list_table")
-                rows = table.find_elements_by_tag_name("tr")
-                self.assertIn(row_text, [row.text for row in rows])
+                self.browser.execute_async_script(WAIT_FOR_ROW_SCRIPT, row_text)
                 return
-            except (AssertionError, WebDriverException) as e:
-                if time.time() - start_time > MAX_WAIT:
-                    raise e
-                time.sleep(0.5)
+            except WebDriverException:
+                # The page navigated away while we watched it, or timed out
+                time.sleep(interval)
+
+        # Fails with the rows we did find
+        table = self.browser.find_element_by_id("id_list_table")
+        rows = table.find_elements_by_tag_name("tr")
+        self.assertIn(row_text, [row.text for row in rows])
 
     def get_item_input_box(self):
-        return self.browser.find_element_by_id("id_text")
+        return self.wait_for(lambda: self.browser.find_element_by_id("id_text"))
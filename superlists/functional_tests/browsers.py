@@ -0,0 +1,115 @@
+"""
+A pool of browsers shared by the functional tests of a process
+"""
+import os
+from multiprocessing.util import Finalize
+
+from selenium import webdriver
+from selenium.webdriver.firefox.options import Options
+
+# Empties the storage of the page's site, unregisters its service workers and
+# deletes their caches, so the next test doesn't get pages or queued items
+# left over by this one
+CLEAR_SITE_SCRIPT = """
+var done = arguments[arguments.length - 1];
+var work = [];
+// Pages like about:blank have no site to clear
+var site = /^https?:$/.test(location.protocol);
+
+try {
+    localStorage.clear();
+    sessionStorage.clear();
+} catch (e) {}
+if (site && navigator.serviceWorker) {
+    work.push(navigator.serviceWorker.getRegistrations().then(function (registrations) {
+        return Promise.all(registrations.map(function (registration) {
+            return registration.unregister();
+        }));
+    }));
+}
+if (site && window.caches) {
+    work.push(caches.keys().then(function (names) {
+        return Promise.all(names.map(function (name) {
+            return caches.delete(name);
+        }));
+    }));
+}
+Promise.all(work).then(function () {
+    done(true);
+}, function () {
+    done(false);
+});
+"""
+
+
+class BrowserPool:
+    """
+    Keeps started browsers around, so the tests don't pay for starting
+    Firefox every time.
+
+    Each test process has its own pool. Set HEADED=1 to watch the browsers.
+    """
+
+    def __init__(self):
+        self.idle = []
+        self.started = []
+
+    def start_browser(self):
+        """
+        Starts a new Firefox
+        """
+        options = Options()
+        options.headless = not os.environ.get("HEADED")
+        browser = webdriver.Firefox(options=options)
+        self.started.append(browser)
+        return browser
+
+    def acquire(self):
+        """
+        Returns an idle browser, starting one if there are none
+        """
+        if self.idle:
+            return self.idle.pop()
+        return self.start_browser()
+
+    def release(self, browser):
+        """
+        Wipes everything a test left in the browser and puts it back into
+        the pool
+        """
+        try:
+            # Cookies, storage and service workers belong to the page's site,
+            # so they must be wiped before leaving it
+            browser.delete_all_cookies()
+            if not browser.execute_async_script(CLEAR_SITE_SCRIPT):
+                raise RuntimeError("The service workers or caches weren't cleared")
+            browser.get("about:blank")
+        except Exception:  # pylint: disable=broad-except
+            # A browser that can't be cleaned up isn't worth keeping
+            self.discard(browser)
+        else:
+            self.idle.append(browser)
+
+    def discard(self, browser):
+        """
+        Quits a browser for good
+        """
+        self.started.remove(browser)
+        try:
+            browser.quit()
+        except Exception:  # pylint: disable=broad-except
+            pass
+
+    def close_all(self):
+        """
+        Quits every browser of the pool
+        """
+        for browser in list(self.started):
+            self.discard(browser)
+        self.idle = []
+
+
+pool = BrowserPool()
+
+# Finalize, unlike atexit, also runs when a parallel test worker exits
+Finalize(pool, pool.close_all, exitpriority=10)
@@ -0,0 +1,30 @@
+"""
+Test runner for the functional tests
+"""
+import os
+
+from django.test.runner import DiscoverRunner
+
+
+class FunctionalTestRunner(DiscoverRunner):
+    """
+    Runs the functional tests in one process per CPU, unless --parallel
+    asks for some other number of processes, like --parallel 1 for a serial
+    run. Use it with
+
+        python manage.py test functional_tests \\
+            --testrunner functional_tests.runner.FunctionalTestRunner
+    """
+
+    @classmethod
+    def add_arguments(cls, parser):
+        super().add_arguments(parser)
+        # Tells a missing --parallel apart from --parallel 1
+        parser.set_defaults(parallel=None)
+
+    def __init__(self, parallel=None, **kwargs):
+        # Firefox spends most of its time waiting, so one process per CPU
+        # keeps every core busy
+        if parallel is None:
+            parallel = os.cpu_count() or 1
+        super().__init__(parallel=parallel, **kwargs)
@@ -1,7 +1,6 @@
 """
 Functional tests for the Lists app
 """
-from selenium import webdriver
 from selenium.webdriver.common.keys import Keys
 
 from .base import FunctionalTests
@@ -63,8 +62,7 @@ class NewVisitorTest(FunctionalTests):
         self.assertRegex(edith_list_url, '/lists/.+')
 
         # Now a new user, Francis, comes along to the site.
-        self.browser.quit()
-        self.browser = webdriver.Firefox()
+        self.restart_browser()
 
         # Francis visits the home page. There is no sign of Edith's list
         self.browser.get(self.live_server_url)
@@ -0,0 +1,74 @@
+"""
+Batched tracking of when each list was last visited.
+
+Writing `List.last_accessed` on every GET would turn each read into a write.
+Instead, a visit is only recorded when the stored time is older than
+`LIST_ACCESS_RESOLUTION`, and recorded visits are kept in memory until
+`LIST_ACCESS_FLUSH_INTERVAL` has passed. Then a single UPDATE per shard
+stores them.
+"""
+import atexit
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from lists.models import List
+from lists.sharding import shard_for_list
+
+
+class AccessTracker:
+    """
+    Collects the ids of visited lists and writes them in batches
+    """
+
+    def __init__(self, resolution, flush_interval):
+        self.resolution = timedelta(seconds=resolution)
+        self.flush_interval = timedelta(seconds=flush_interval)
+        # Maps the id of each visited list to its shard
+        self.pending = {}
+        self.last_flush = timezone.now()
+        self.lock = threading.Lock()
+
+    def touch(self, list_):
+        """
+        Records a visit to `list_`, flushing the pending visits if it's time
+        """
+        now = timezone.now()
+        if now - list_.last_accessed < self.resolution:
+            return
+
+        with self.lock:
+            self.pending[list_.id] = shard_for_list(list_.public_id)
+            due = now - self.last_flush >= self.flush_interval
+
+        if due:
+            self.flush()
+
+    def flush(self):
+        """
+        Stores every pending visit with a single UPDATE per shard
+        """
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            self.last_flush = timezone.now()
+
+        for alias in set(pending.values()):
+            ids = [list_id for list_id, shard in pending.items() if shard == alias]
+            List.objects.using(alias).filter(id__in=ids).update(
+                last_accessed=self.last_flush
+            )
+
+
+tracker = AccessTracker(
+    settings.LIST_ACCESS_RESOLUTION, settings.LIST_ACCESS_FLUSH_INTERVAL
+)
+atexit.register(tracker.flush)
+
+
+def record_access(list_):
+    """
+    Records a visit to `list_` in the tracker of this process
+    """
+    tracker.touch(list_)
@@ -1,3 +1,172 @@
+"""
+Admin registrations for the Lists app.
+
+The lists and items tables are too big for the default changelist, which
+counts every row and pages with OFFSET. Here the changelists page by keyset
+instead: each page holds the rows with a primary key below the last one of
+the previous page, newest first, so every page costs the same. Counts are
+capped, or estimated from the table statistics on PostgreSQL, and searches
+and filters only use indexed columns.
+"""
 from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import ChangeList
+from django.db import connections
+
+from lists import tasks
+from lists.models import Item, List
+
+# Query string parameter with the primary key the page starts after
+CURSOR_VAR = "before"
+
+
+def estimated_count(queryset, limit):
+    """
+    Counts the rows of `queryset`, reading at most `limit` of them.
+
+    Returns the count and whether it's exact. Past `limit`, the count of a
+    whole table comes from the statistics of PostgreSQL, and is just `limit`
+    otherwise.
+    """
+    count = queryset.order_by()[:limit].count()
+    if count < limit:
+        return count, True
+
+    connection = connections[queryset.db]
+    if not queryset.query.where and connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples FROM pg_class WHERE relname = %s",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        if row is not None:
+            return max(int(row[0]), limit), False
+    return limit, False
+
+
+class KeysetChangeList(ChangeList):
+    """
+    Changelist that pages by primary key, without counting or offsets
+    """
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_VAR, None)
+        return lookup_params
+
+    def get_results(self, request):
+        queryset = self.queryset.order_by("-pk")
+        self.cursor = self.params.get(CURSOR_VAR)
+        if self.cursor is not None:
+            try:
+                queryset = queryset.filter(pk__lt=int(self.cursor))
+            except ValueError:
+                raise IncorrectLookupParameters
+        # One more row tells whether there is a next page
+        rows = list(queryset[: self.list_per_page + 1])
+
+        self.result_list = rows[: self.list_per_page]
+        self.result_count = len(self.result_list)
+        self.next_page_url = None
+        if len(rows) > self.list_per_page:
+            last_pk = self.result_list[-1].pk
+            self.next_page_url = self.get_query_string({CURSOR_VAR: last_pk})
+        self.first_page_url = self.get_query_string(remove=[CURSOR_VAR])
+
+        count, exact = estimated_count(self.queryset, self.model_admin.count_limit)
+        noun = self.opts.verbose_name if count == 1 else self.opts.verbose_name_plural
+        self.count_label = f"{count} {noun}" if exact else f"about {count} {noun}"
+
+        self.show_full_result_count = False
+        self.full_result_count = None
+        self.show_admin_actions = True
+        self.can_show_all = False
+        # Keeps the pagination tag from numbering the pages
+        self.multi_page = False
+        self.paginator = None
+
+
+class KeysetAdmin(admin.ModelAdmin):
+    """
+    ModelAdmin for the tables that are too big to count or sort
+    """
+
+    # Rows counted before falling back to an estimate
+    count_limit = 1000
+    ordering = ("-pk",)
+    show_full_result_count = False
+    # Keyset pages only work in primary key order
+    sortable_by = ()
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+
+@admin.register(List)
+class ListAdmin(KeysetAdmin):
+    """
+    Admin for lists. Lists are deleted in the background by the
+    lists.tasks.delete_list task, since the default deletion loads every
+    item of the list.
+    """
+
+    actions = ["delete_in_batches"]
+    list_display = (
+        "id",
+        "public_id",
+        "owner_id",
+        "updated_at",
+        "last_accessed",
+        "archived",
+    )
+    list_filter = ("last_accessed",)
+    search_fields = ("=public_id",)
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        actions.pop("delete_selected", None)
+        return actions
+
+    def get_deleted_objects(self, objs, request):
+        # The default lists every item that goes with the lists. Only whether
+        # there are any matters, for the permission to delete them
+        deleted = [str(obj) for obj in objs]
+        perms_needed = set()
+        if objs and not request.user.has_perm("lists.delete_item"):
+            items = Item.objects.using(objs[0]._state.db)
+            if items.filter(list_id__in=[obj.id for obj in objs]).exists():
+                perms_needed.add(Item._meta.verbose_name)
+        return (
+            deleted,
+            {List._meta.verbose_name_plural: len(deleted)},
+            perms_needed,
+            [],
+        )
+
+    def delete_model(self, request, obj):
+        # Like the action, so a big list doesn't hold up a web worker
+        tasks.delete_list.enqueue(obj.id, obj._state.db)
+
+    def delete_in_batches(self, request, queryset):
+        """
+        Deletes the selected lists in the background
+        """
+        list_ids = list(queryset.values_list("id", flat=True))
+        for list_id in list_ids:
+            tasks.delete_list.enqueue(list_id, queryset.db)
+        self.message_user(request, f"Deleting {len(list_ids)} lists in the background")
+
+    delete_in_batches.short_description = "Delete selected lists in the background"
+
+
+@admin.register(Item)
+class ItemAdmin(KeysetAdmin):
+    """
+    Admin for items
+    """
 
-# Register your models here.
+    list_display = ("id", "text", "list")
+    list_select_related = ("list",)
+    raw_id_fields = ("list",)
+    search_fields = ("=list__public_id",)
@@ -0,0 +1,84 @@
+"""
+Moves the items of abandoned lists out of the Item table and back.
+
+An archived list keeps its row in List, so its URL still works, but its
+items are stored as a single compressed blob in ArchivedList. The first
+visit to the list puts them back.
+"""
+import json
+import zlib
+
+from django.db import transaction
+
+from lists.models import ArchivedList, Item, ItemBatch, List
+from lists.owners import forget_count
+from lists.sharding import shard_for_list
+
+# Keeps the id__in lists under the limit of query parameters of SQLite
+DELETE_BATCH_SIZE = 500
+
+
+def pack_items(texts):
+    """
+    Compresses the texts of a list's items
+    """
+    return zlib.compress(json.dumps(texts).encode())
+
+
+def unpack_items(blob):
+    """
+    Reverses pack_items
+    """
+    return json.loads(zlib.decompress(bytes(blob)).decode())
+
+
+def archive_list(list_id, using):
+    """
+    Moves the items of the list, stored in the `using` shard, into an
+    ArchivedList.
+
+    Returns False if the list was already archived.
+    """
+    with transaction.atomic(using=using):
+        # Claiming the list first keeps two archivers from racing
+        lists = List.objects.using(using)
+        if not lists.filter(id=list_id, archived=False).update(archived=True):
+            return False
+
+        items = Item.objects.using(using).filter(list_id=list_id)
+        rows = list(items.order_by("id").values_list("id", "text"))
+        ArchivedList.objects.using(using).create(
+            list_id=list_id, items=pack_items([text for _, text in rows])
+        )
+        # Only the items in the archive: one added since they were read stays
+        # in Item rather than being lost
+        ids = [item_id for item_id, _ in rows]
+        for start in range(0, len(ids), DELETE_BATCH_SIZE):
+            items.filter(id__in=ids[start : start + DELETE_BATCH_SIZE]).delete()
+        # Batches are only sent again within minutes, so idle lists don't
+        # need their ids anymore
+        ItemBatch.objects.using(using).filter(list_id=list_id).delete()
+        owner_id = lists.filter(id=list_id).values_list("owner_id", flat=True).get()
+    if owner_id is not None:
+        forget_count(owner_id)
+    return True
+
+
+def restore_list(list_):
+    """
+    Puts the items of an archived list back into Item, in their
+    original order
+    """
+    # Not list_._state.db, since the list may have been read from a replica
+    shard = shard_for_list(list_.public_id)
+    with transaction.atomic(using=shard):
+        # Only the request that flips the flag restores the items
+        lists = List.objects.using(shard)
+        if lists.filter(id=list_.id, archived=True).update(archived=False):
+            archive = ArchivedList.objects.using(shard).get(list_id=list_.id)
+            Item.objects.using(shard).bulk_create(
+                Item(list_id=list_.id, text=text)
+                for text in unpack_items(archive.items)
+            )
+            archive.delete()
+    list_.archived = False
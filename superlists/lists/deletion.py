@@ -0,0 +1,59 @@
+"""
+Deletes lists without loading all their items.
+
+A plain `list_.delete()` makes Django's collector read every item of the list
+into memory and send signals for each of them before deleting anything.
+`delete_list` deletes the items in batches of `LIST_DELETE_BATCH_SIZE`
+instead. When nothing listens to the delete signals of Item, the batches are
+deleted straight away with a DELETE; otherwise each batch goes through the
+collector, so receivers still see every item.
+
+Each batch commits on its own, so an interrupted deletion can just be run
+again. Queue the `lists.tasks.delete_list` task to delete a list in the
+background.
+"""
+from django.conf import settings
+from django.db.models import signals
+
+from lists.models import ArchivedList, Item, List
+from lists.owners import forget_count
+
+
+def has_delete_receivers(model):
+    """
+    Does anything listen to the deletions of `model`?
+    """
+    return signals.pre_delete.has_listeners(model) or signals.post_delete.has_listeners(
+        model
+    )
+
+
+def delete_list(list_id, using, batch_size=None):
+    """
+    Deletes the list, stored in the `using` shard, along with its items and
+    archive. Returns how many items were deleted.
+    """
+    batch_size = batch_size or settings.LIST_DELETE_BATCH_SIZE
+    items = Item.objects.using(using).filter(list_id=list_id)
+    fast = not has_delete_receivers(Item)
+
+    deleted = 0
+    while True:
+        pks = list(items.order_by("id").values_list("id", flat=True)[:batch_size])
+        if not pks:
+            break
+        batch = Item.objects.using(using).filter(id__in=pks)
+        if fast:
+            # pylint: disable=protected-access
+            deleted += batch._raw_delete(using)
+        else:
+            deleted += batch.delete()[0]
+
+    ArchivedList.objects.using(using).filter(list_id=list_id).delete()
+    lists = List.objects.using(using).filter(id=list_id)
+    owner_id = lists.values_list("owner_id", flat=True).first()
+    # Any item added since the last batch goes with the list
+    lists.delete()
+    if owner_id is not None:
+        forget_count(owner_id)
+    return deleted
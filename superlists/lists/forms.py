@@ -15,7 +15,9 @@ class ItemForm(forms.models.ModelForm):
 
     def save(self, for_list):
         self.instance.list = for_list
-        return super().save()
+        item = super().save()
+        for_list.mark_updated()
+        return item
 
     class Meta:
         model = Item
@@ -29,5 +31,3 @@ class ItemForm(forms.models.ModelForm):
             )
         }
         error_messages = {"text": {"required": EMPTY_ITEM_ERROR}}
-
-    
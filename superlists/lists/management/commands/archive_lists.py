@@ -0,0 +1,64 @@
+"""
+Archives the lists nobody has visited in a while
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from lists.archive import archive_list
+from lists.models import List
+
+
+class Command(BaseCommand):
+    """
+    archive_lists moves the items of idle lists into compact archive storage
+    """
+
+    help = "Moves the items of lists idle for too long into compressed archives"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--idle-days",
+            type=int,
+            default=settings.LIST_ARCHIVE_AFTER_DAYS,
+            help="Archive lists not visited for this many days",
+        )
+        parser.add_argument(
+            "--limit", type=int, default=None, help="Archive at most this many lists"
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="How many list ids to read from the database at once",
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options["idle_days"])
+        remaining = options["limit"]
+
+        archived = 0
+        for alias in settings.LIST_SHARDS:
+            idle_lists = (
+                List.objects.using(alias)
+                .filter(archived=False, last_accessed__lt=cutoff)
+                .order_by("last_accessed")
+                .values_list("id", flat=True)
+            )
+            while remaining is None or remaining > 0:
+                batch_size = options["batch_size"]
+                if remaining is not None:
+                    batch_size = min(batch_size, remaining)
+
+                # Archived lists leave the queryset, so we always read its head
+                batch = list(idle_lists[:batch_size])
+                if not batch:
+                    break
+                if remaining is not None:
+                    remaining -= len(batch)
+                for list_id in batch:
+                    archived += archive_list(list_id, alias)
+
+        self.stdout.write(f"Archived {archived} lists idle since {cutoff:%Y-%m-%d}")
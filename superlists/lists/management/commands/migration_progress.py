@@ -0,0 +1,32 @@
+"""
+Reports how far the online migration backfills got
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from lists.models import BackfillProgress
+
+
+class Command(BaseCommand):
+    """
+    migration_progress lists the backfills of every shard, running or done
+    """
+
+    help = "Shows the progress of the backfills run by online migrations"
+
+    def handle(self, *args, **options):
+        found = False
+        for alias in settings.LIST_SHARDS:
+            for progress in BackfillProgress.objects.using(alias).order_by("id"):
+                found = True
+                if progress.finished_at is None:
+                    state = "running"
+                else:
+                    state = f"finished {progress.finished_at:%Y-%m-%d %H:%M}"
+                self.stdout.write(
+                    f"{alias}: {progress.name}: {progress.rows_done} rows, up to "
+                    f"id {progress.last_pk}, {state}"
+                )
+
+        if not found:
+            self.stdout.write("No backfills have run")
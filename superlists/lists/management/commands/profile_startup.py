@@ -0,0 +1,146 @@
+"""
+Measures how long a worker takes to start and how much memory it holds
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.core.management.base import BaseCommand
+
+# Loads the WSGI application and the URLconf like a gunicorn worker serving
+# its first request, in a fresh interpreter
+WORKER_SCRIPT = """
+import json, os, sys, time, tracemalloc
+
+def rss_kb():
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return 0
+
+profile = sys.argv[2] == "profile"
+if profile:
+    tracemalloc.start()
+started = time.perf_counter()
+os.environ["DJANGO_SETTINGS_MODULE"] = sys.argv[1]
+from django.core.wsgi import get_wsgi_application
+from django.urls import get_resolver
+application = get_wsgi_application()
+get_resolver().url_patterns
+report = {"seconds": time.perf_counter() - started, "rss": rss_kb()}
+
+if profile:
+    from django.apps import apps
+    report["apps"] = [config.name for config in apps.get_app_configs()]
+    report["files"] = {
+        getattr(module, "__file__", None): name for name, module in sys.modules.items()
+    }
+    report["memory"] = {
+        stat.traceback[0].filename: stat.size
+        for stat in tracemalloc.take_snapshot().statistics("filename")
+    }
+print(json.dumps(report))
+"""
+
+
+def owner(module, packages):
+    """
+    Returns the app, or else the top level package, `module` belongs to
+    """
+    for package in packages:
+        if module == package or module.startswith(package + "."):
+            return package
+    return module.split(".")[0]
+
+
+def parse_importtime(stderr):
+    """
+    Returns the self and cumulative import times, in microseconds, of every
+    module in the output of python -X importtime
+    """
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:") :].split("|")
+        times[module.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+class Command(BaseCommand):
+    """
+    profile_startup starts fresh interpreters that load the site like a
+    worker does, and reports where the time and memory go
+    """
+
+    help = "Reports the start up time and memory of a worker, per app and module"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--profile",
+            default=os.environ.get("DJANGO_SETTINGS_MODULE", "superlists.settings"),
+            help="Settings module of the workers to measure",
+        )
+        parser.add_argument(
+            "--runs", type=int, default=5, help="Cold starts to take the median of"
+        )
+        parser.add_argument(
+            "--top", type=int, default=15, help="How many modules and apps to list"
+        )
+
+    def start_worker(self, settings_module, profile):
+        command = [sys.executable]
+        if profile:
+            command += ["-X", "importtime"]
+        command += ["-c", WORKER_SCRIPT, settings_module]
+        command.append("profile" if profile else "time")
+        worker = subprocess.run(
+            command, capture_output=True, text=True, check=True, cwd=os.getcwd()
+        )
+        return json.loads(worker.stdout.splitlines()[-1]), worker.stderr
+
+    def handle(self, *args, **options):
+        settings_module = options["profile"]
+        runs = [
+            self.start_worker(settings_module, False)[0] for _ in range(options["runs"])
+        ]
+        seconds = statistics.median(run["seconds"] for run in runs)
+        rss = statistics.median(run["rss"] for run in runs)
+        self.stdout.write(
+            f"{settings_module}: cold start {seconds * 1000:.0f} ms, "
+            f"RSS {rss / 1024:.1f} MB (median of {len(runs)} runs)"
+        )
+
+        report, stderr = self.start_worker(settings_module, True)
+        times = parse_importtime(stderr)
+        # Longest names first, so django.contrib.admin wins over django
+        packages = sorted(report["apps"], key=len, reverse=True)
+
+        per_owner = {}
+        for module, (self_us, _) in times.items():
+            entry = per_owner.setdefault(owner(module, packages), [0, 0])
+            entry[0] += self_us
+        for filename, size in report["memory"].items():
+            module = report["files"].get(filename)
+            if module is not None:
+                per_owner.setdefault(owner(module, packages), [0, 0])[1] += size
+
+        top = options["top"]
+        self.stdout.write("\nImport time and Python memory per app or package:")
+        ranked = sorted(per_owner.items(), key=lambda item: item[1][0], reverse=True)
+        for name, (self_us, size) in ranked[:top]:
+            self.stdout.write(
+                f"  {self_us / 1000:8.1f} ms {size / 1024:8.0f} KB  {name}"
+            )
+
+        self.stdout.write("\nSlowest modules, including what they import:")
+        ranked = sorted(times.items(), key=lambda item: item[1][1], reverse=True)
+        for module, (_, cumulative_us) in ranked[:top]:
+            self.stdout.write(f"  {cumulative_us / 1000:8.1f} ms  {module}")
@@ -0,0 +1,58 @@
+"""
+Moves lists into the shard their public id maps to
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from lists.models import List
+from lists.sharding import move_list, shard_for_list
+
+
+class Command(BaseCommand):
+    """
+    rebalance_shards moves every list that is in the wrong shard, usually
+    after a shard was appended to LIST_SHARDS
+    """
+
+    help = "Moves every list, with its items, into the shard it maps to"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="How many list ids to read from the database at once",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only count the lists that would be moved",
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        for source in settings.LIST_SHARDS:
+            lists = (
+                List.objects.using(source).order_by("id").values_list("id", "public_id")
+            )
+
+            moved = 0
+            last_id = 0
+            while True:
+                batch = list(lists.filter(id__gt=last_id)[: options["batch_size"]])
+                if not batch:
+                    break
+                last_id = batch[-1][0]
+
+                for list_id, public_id in batch:
+                    target = shard_for_list(public_id)
+                    if target != source:
+                        if not options["dry_run"]:
+                            move_list(list_id, source, target)
+                        moved += 1
+
+            self.stdout.write(f"{source}: {moved} lists moved out")
+            total += moved
+
+        verb = "would be moved" if options["dry_run"] else "moved"
+        self.stdout.write(f"{total} lists {verb}")
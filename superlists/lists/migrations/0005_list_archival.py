@@ -0,0 +1,33 @@
+# Generated by Django 2.2.28 on 2026-10-19 12:49
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lists', '0004_item_list'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedList',
+            fields=[
+                ('list', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='archive', serialize=False, to='lists.List')),
+                ('items', models.BinaryField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='list',
+            name='archived',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='list',
+            name='last_accessed',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+    ]
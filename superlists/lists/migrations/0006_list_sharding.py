@@ -0,0 +1,20 @@
+# Generated by Django 2.2.28 on 2026-10-19 12:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lists', '0005_list_archival'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListIdBlock',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('next_id', models.BigIntegerField()),
+            ],
+        ),
+    ]
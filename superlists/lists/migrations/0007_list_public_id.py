@@ -0,0 +1,57 @@
+# Generated by Django 2.2.28 on 2026-10-19 12:55
+
+from django.db import migrations, models, transaction
+import lists.public_ids
+
+
+BATCH_SIZE = 1000
+
+
+def fill_public_ids(apps, schema_editor):
+    """
+    Gives every existing list a public id of its own, a batch at a time.
+    Each batch commits on its own, so running the migration again after an
+    interruption only fills the lists that are left.
+    """
+    List = apps.get_model('lists', 'List')
+    db = schema_editor.connection.alias
+    missing = List.objects.using(db).filter(public_id__isnull=True).order_by('id')
+
+    last_id = 0
+    while True:
+        batch = list(missing.filter(id__gt=last_id).only('id')[:BATCH_SIZE])
+        if not batch:
+            break
+        for list_ in batch:
+            list_.public_id = lists.public_ids.new_public_id()
+        with transaction.atomic(using=db):
+            List.objects.using(db).bulk_update(batch, ['public_id'])
+        last_id = batch[-1].id
+
+
+class Migration(migrations.Migration):
+
+    # The backfill commits batch by batch
+    atomic = False
+
+    dependencies = [
+        ('lists', '0006_list_sharding'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='list',
+            name='public_id',
+            field=models.CharField(editable=False, max_length=22, null=True),
+        ),
+        migrations.RunPython(
+            fill_public_ids,
+            migrations.RunPython.noop,
+            hints={'model_name': 'list'},
+        ),
+        migrations.AlterField(
+            model_name='list',
+            name='public_id',
+            field=models.CharField(default=lists.public_ids.new_public_id, editable=False, max_length=22, unique=True),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 2.2.28 on 2026-10-19 14:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lists', '0007_list_public_id'),
+    ]
+
+    operations = [
+        # 0004 created Item.list with DO_NOTHING while the model says CASCADE.
+        # on_delete only lives in Django, so only the state has to change:
+        # altering the column would rebuild the whole Item table on SQLite.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='item',
+                    name='list',
+                    field=models.ForeignKey(default=None, on_delete=django.db.models.deletion.CASCADE, to='lists.List'),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name='BackfillProgress',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('last_pk', models.BigIntegerField(default=0)),
+                ('rows_done', models.BigIntegerField(default=0)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(null=True)),
+            ],
+        ),
+    ]
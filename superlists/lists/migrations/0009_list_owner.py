@@ -0,0 +1,25 @@
+from django.db import migrations, models
+
+import lists.online_migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lists', '0008_online_migrations'),
+    ]
+
+    # Both columns are nullable, so adding them doesn't rewrite the table.
+    # 0010 fills updated_at and 0011 makes it required.
+    operations = [
+        lists.online_migrations.AddNullableField(
+            model_name='list',
+            name='owner_id',
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        lists.online_migrations.AddNullableField(
+            model_name='list',
+            name='updated_at',
+            field=models.DateTimeField(null=True),
+        ),
+    ]
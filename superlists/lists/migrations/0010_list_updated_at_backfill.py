@@ -0,0 +1,27 @@
+from django.db import migrations
+from django.db.models import F
+
+import lists.online_migrations
+
+
+def fill_updated_at(batch):
+    # The last visit is the closest we have to the last change
+    batch.update(updated_at=F('last_accessed'))
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('lists', '0009_list_owner'),
+    ]
+
+    operations = [
+        lists.online_migrations.RunBackfill(
+            'list_updated_at',
+            'list',
+            fill_updated_at,
+            where={'updated_at__isnull': True},
+        ),
+    ]
@@ -0,0 +1,25 @@
+from django.db import migrations, models
+import django.utils.timezone
+
+import lists.online_migrations
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('lists', '0010_list_updated_at_backfill'),
+    ]
+
+    operations = [
+        lists.online_migrations.EnforceNotNull(
+            model_name='list',
+            name='updated_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        lists.online_migrations.AddIndexConcurrently(
+            model_name='list',
+            index=models.Index(fields=['owner_id', '-updated_at', '-id'], name='lists_list_owner_idx'),
+        ),
+    ]
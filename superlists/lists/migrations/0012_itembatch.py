@@ -0,0 +1,25 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lists', '0011_list_owner_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItemBatch',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('batch_id', models.CharField(max_length=36)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('list', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='lists.List')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='itembatch',
+            constraint=models.UniqueConstraint(fields=('list', 'batch_id'), name='lists_itembatch_unique'),
+        ),
+    ]
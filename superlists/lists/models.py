@@ -3,6 +3,36 @@ Data models for the Lists app
 """
 from django.db import models
 from django.urls import reverse
+from django.utils import timezone
+
+from lists.public_ids import new_public_id
+
+
+class ShardedQuerySet(models.QuerySet):
+    """
+    QuerySet for the models that live in the shard of their list
+    """
+
+    def create(self, **kwargs):
+        # Unless a database was picked with using(), the router chooses one
+        # from the new object, which knows its list
+        obj = self.model(**kwargs)
+        self._for_write = True
+        obj.save(force_insert=True, using=self._db)
+        return obj
+
+
+class ShardedManager(models.Manager.from_queryset(ShardedQuerySet)):
+    """
+    Manager for the models that live in the shard of their list
+    """
+
+    def in_shard_of(self, public_id):
+        """
+        Returns a queryset routed to the shard that holds the list with the
+        given public id
+        """
+        return self.db_manager(hints={"public_id": public_id}).get_queryset()
 
 
 class List(models.Model):
@@ -12,11 +42,53 @@ class List(models.Model):
     and acting as a foreign key for the Item class
     """
 
+    # Used in URLs and to pick the shard of the list
+    public_id = models.CharField(
+        max_length=22, unique=True, default=new_public_id, editable=False
+    )
+    # Updated in batches by lists.access, so it may lag behind a little
+    last_accessed = models.DateTimeField(default=timezone.now, db_index=True)
+    # Archived lists keep their items in an ArchivedList instead of Item
+    archived = models.BooleanField(default=False)
+    # Id of the User that owns the list, if any. Users live in `default` and
+    # lists in every shard, so it's a plain column rather than a foreign key
+    owner_id = models.IntegerField(null=True, blank=True, editable=False)
+    # When items were last added. Owners see their lists in this order
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    objects = ShardedManager()
+
+    class Meta:
+        indexes = [
+            # Pages of the lists of an owner, by lists.owners
+            models.Index(
+                fields=["owner_id", "-updated_at", "-id"], name="lists_list_owner_idx"
+            )
+        ]
+
+    def save(self, *args, **kwargs):  # pylint: disable=arguments-differ
+        # Ids come from a counter shared by every shard, so moving a list to
+        # another shard never clashes with the lists already there
+        if self.id is None:
+            from lists.sharding import allocate_list_id
+
+            self.id = allocate_list_id()
+        super().save(*args, **kwargs)
+
     def get_absolute_url(self):
         """
         Returns the URL for the list representation
         """
-        return reverse("view_list", args=[self.id])
+        return reverse("view_list", args=[self.public_id])
+
+    def mark_updated(self):
+        """
+        Records that items were just added to the list
+        """
+        self.updated_at = timezone.now()
+        List.objects.in_shard_of(self.public_id).filter(id=self.id).update(
+            updated_at=self.updated_at
+        )
 
 
 class Item(models.Model):
@@ -26,3 +98,62 @@ class Item(models.Model):
 
     text = models.TextField(default="")
     list = models.ForeignKey(List, default=None, on_delete=models.CASCADE)
+
+    objects = ShardedManager()
+
+
+class ArchivedList(models.Model):
+    """
+    Compact storage for the items of a list that nobody visits anymore.
+    The texts of the items are kept, in order, as zlib compressed JSON.
+    """
+
+    list = models.OneToOneField(
+        List, primary_key=True, on_delete=models.CASCADE, related_name="archive"
+    )
+    items = models.BinaryField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    objects = ShardedManager()
+
+
+class ItemBatch(models.Model):
+    """
+    A batch of items sent by the offline client. The client names each batch,
+    so a batch sent again after its response was lost isn't added twice.
+    """
+
+    list = models.ForeignKey(List, on_delete=models.CASCADE)
+    batch_id = models.CharField(max_length=36)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = ShardedManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["list", "batch_id"], name="lists_itembatch_unique"
+            )
+        ]
+
+
+class ListIdBlock(models.Model):
+    """
+    Counter that hands out blocks of List ids. It only lives in the
+    `LIST_ID_DATABASE`, so ids are unique across every shard.
+    """
+
+    next_id = models.BigIntegerField()
+
+
+class BackfillProgress(models.Model):
+    """
+    How far a backfill of lists.online_migrations got in one database.
+    Backfills resume after `last_pk`.
+    """
+
+    name = models.CharField(max_length=100, unique=True)
+    last_pk = models.BigIntegerField(default=0)
+    rows_done = models.BigIntegerField(default=0)
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True)
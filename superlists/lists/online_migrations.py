@@ -0,0 +1,279 @@
+"""
+Migration operations that change big tables without locking them.
+
+Schema changes go through expand/contract steps, each in its own migration:
+
+1. `AddNullableField` adds the new column. With no default and no NOT NULL,
+   adding it doesn't rewrite the table.
+2. `RunBackfill` fills the column in small batches, pausing between them.
+   Every batch commits together with its progress in `BackfillProgress`, so
+   an interrupted `migrate` picks up where it stopped. Run the
+   `migration_progress` command to watch it.
+3. `AddIndexConcurrently` builds indexes without blocking writes.
+4. `EnforceNotNull` makes the column required, validating the existing
+   rows without blocking writes.
+
+The operations that can't run inside a transaction on PostgreSQL need
+`atomic = False` on their migration. On other databases they fall back to the
+plain Django operations.
+"""
+import sys
+import time
+from contextlib import contextmanager
+
+from django.db import NotSupportedError, router, transaction
+from django.db.migrations import AddField, AddIndex, AlterField
+from django.db.migrations.operations.base import Operation
+from django.utils import timezone
+
+BATCH_SIZE = 1000
+# Seconds to sleep between batches, giving other queries room
+PAUSE = 0.1
+# Give up on DDL that waits longer than this for a lock, instead of queueing
+# every other query on the table behind it
+LOCK_TIMEOUT = "5s"
+
+
+def _is_postgresql(schema_editor):
+    return schema_editor.connection.vendor == "postgresql"
+
+
+def _require_non_atomic(schema_editor, operation):
+    if schema_editor.connection.in_atomic_block:
+        raise NotSupportedError(
+            f"{operation.__class__.__name__} can't run inside a transaction, "
+            "set atomic = False on its migration"
+        )
+
+
+@contextmanager
+def _lock_timeout(schema_editor):
+    schema_editor.execute(f"SET lock_timeout = '{LOCK_TIMEOUT}'")
+    try:
+        yield
+    finally:
+        schema_editor.execute("RESET lock_timeout")
+
+
+def write_progress(progress, last_pk):
+    """
+    Prints how far a backfill got
+    """
+    percent = 100 * progress.last_pk // last_pk if last_pk else 100
+    sys.stdout.write(
+        f"  {progress.name}: {progress.rows_done} rows, up to id "
+        f"{progress.last_pk} of {last_pk} ({percent}%)\n"
+    )
+    sys.stdout.flush()
+
+
+def run_backfill(
+    name,
+    queryset,
+    update,
+    progress_model,
+    batch_size=BATCH_SIZE,
+    pause=PAUSE,
+    report=write_progress,
+):
+    """
+    Calls `update` with querysets of `batch_size` rows of `queryset`, in
+    primary key order, sleeping `pause` seconds between them.
+
+    Each batch commits along with a `progress_model` row named `name`, so
+    running the backfill again skips the rows it already did. Returns that
+    row.
+    """
+    db = queryset.db
+    progress, _ = progress_model.objects.using(db).get_or_create(name=name)
+    if progress.finished_at is not None:
+        return progress
+
+    # Cheaper than counting the rows, and good enough to report progress
+    last_pk = queryset.order_by("-pk").values_list("pk", flat=True).first() or 0
+    while True:
+        pks = list(
+            queryset.filter(pk__gt=progress.last_pk)
+            .order_by("pk")
+            .values_list("pk", flat=True)[:batch_size]
+        )
+        if not pks:
+            break
+
+        with transaction.atomic(using=db):
+            update(queryset.filter(pk__in=pks))
+            progress.last_pk = pks[-1]
+            progress.rows_done += len(pks)
+            progress.save(using=db, update_fields=["last_pk", "rows_done"])
+        if report is not None:
+            report(progress, last_pk)
+        if pause:
+            time.sleep(pause)
+
+    progress.finished_at = timezone.now()
+    progress.save(using=db, update_fields=["finished_at"])
+    return progress
+
+
+class AddNullableField(AddField):
+    """
+    Adds a column without rewriting the table. The field must be nullable
+    and have no default; fill it with RunBackfill.
+    """
+
+    def __init__(self, model_name, name, field, preserve_default=True):
+        if not field.null or (field.has_default() and field.default is not None):
+            raise ValueError(
+                f"{model_name}.{name} must be nullable, with no default, to be "
+                "added online"
+            )
+        super().__init__(model_name, name, field, preserve_default)
+
+
+class RunBackfill(Operation):
+    """
+    Applies `update` to the rows of a model, in throttled and resumable
+    batches. `update` gets a queryset of one batch of the historical model.
+    Only rows matching the `where` lookups are visited.
+    """
+
+    reduces_to_sql = False
+    reversible = True
+
+    def __init__(
+        self, name, model_name, update, where=None, batch_size=BATCH_SIZE, pause=PAUSE
+    ):
+        self.name = name
+        self.model_name = model_name
+        self.update = update
+        self.where = where or {}
+        self.batch_size = batch_size
+        self.pause = pause
+
+    def state_forwards(self, app_label, state):
+        pass
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        alias = schema_editor.connection.alias
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if not router.allow_migrate_model(alias, model):
+            return
+        _require_non_atomic(schema_editor, self)
+
+        from_state.clear_delayed_apps_cache()
+        run_backfill(
+            self.name,
+            model._base_manager.using(alias).filter(**self.where),
+            self.update,
+            from_state.apps.get_model("lists", "BackfillProgress"),
+            batch_size=self.batch_size,
+            pause=self.pause,
+        )
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        # Applying the migration again runs the whole backfill again
+        alias = schema_editor.connection.alias
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if router.allow_migrate_model(alias, model):
+            progress_model = to_state.apps.get_model("lists", "BackfillProgress")
+            progress_model.objects.using(alias).filter(name=self.name).delete()
+
+    def describe(self):
+        return f"Backfill {self.name} on {self.model_name}"
+
+
+class AddIndexConcurrently(AddIndex):
+    """
+    Adds an index without blocking writes to the table on PostgreSQL, where
+    its migration needs atomic = False
+    """
+
+    def _drop_sql(self, schema_editor):
+        name = schema_editor.quote_name(self.index.name)
+        return f"DROP INDEX CONCURRENTLY IF EXISTS {name}"
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if not _is_postgresql(schema_editor):
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+            return
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias, model):
+            return
+        _require_non_atomic(schema_editor, self)
+
+        create_sql = str(self.index.create_sql(model, schema_editor))
+        with _lock_timeout(schema_editor):
+            # A concurrent build that failed leaves an invalid index behind
+            schema_editor.execute(self._drop_sql(schema_editor))
+            schema_editor.execute(
+                create_sql.replace("CREATE INDEX", "CREATE INDEX CONCURRENTLY", 1)
+            )
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if not _is_postgresql(schema_editor):
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+            return
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            _require_non_atomic(schema_editor, self)
+            with _lock_timeout(schema_editor):
+                schema_editor.execute(self._drop_sql(schema_editor))
+
+    def describe(self):
+        return f"{super().describe()} concurrently"
+
+
+class EnforceNotNull(AlterField):
+    """
+    Makes a nullable column required. `field` is the field with null=False.
+
+    On PostgreSQL the rows are checked through a NOT VALID check constraint,
+    which doesn't block writes while it's validated, and SET NOT NULL reuses
+    it instead of scanning the table again. Its migration needs
+    atomic = False.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if not _is_postgresql(schema_editor):
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+            return
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias, model):
+            return
+        _require_non_atomic(schema_editor, self)
+
+        quote = schema_editor.quote_name
+        table = quote(model._meta.db_table)
+        column = model._meta.get_field(self.name).column
+        check = quote(f"{model._meta.db_table}_{column}_not_null"[:63])
+        with _lock_timeout(schema_editor):
+            # Left behind when a previous attempt failed
+            schema_editor.execute(
+                f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {check}"
+            )
+            schema_editor.execute(
+                f"ALTER TABLE {table} ADD CONSTRAINT {check} "
+                f"CHECK ({quote(column)} IS NOT NULL) NOT VALID"
+            )
+            schema_editor.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {check}")
+            schema_editor.execute(
+                f"ALTER TABLE {table} ALTER COLUMN {quote(column)} SET NOT NULL"
+            )
+            schema_editor.execute(f"ALTER TABLE {table} DROP CONSTRAINT {check}")
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if not _is_postgresql(schema_editor):
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+            return
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            quote = schema_editor.quote_name
+            column = model._meta.get_field(self.name).column
+            with _lock_timeout(schema_editor):
+                schema_editor.execute(
+                    f"ALTER TABLE {quote(model._meta.db_table)} "
+                    f"ALTER COLUMN {quote(column)} DROP NOT NULL"
+                )
+
+    def describe(self):
+        return f"Enforce NOT NULL on {self.name} on {self.model_name}"
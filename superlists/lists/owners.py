@@ -0,0 +1,96 @@
+"""
+The lists of each owner, newest changes first.
+
+An owner's lists are spread over every shard, so a page takes the next
+`page_size` lists of the owner from each shard, through the index on
+(owner_id, -updated_at, -id), and merges them. Pages start after the last
+list of the previous page instead of at an offset, so every page costs the
+same however many lists the owner has. The number of lists of each owner is
+kept in the cache for `LIST_COUNT_CACHE_SECONDS`, and forgotten whenever a
+list of theirs is created, archived or deleted.
+"""
+import heapq
+from datetime import datetime, timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils.timezone import utc
+
+from lists.models import List
+
+EPOCH = datetime(1970, 1, 1, tzinfo=utc)
+
+
+def _order(list_):
+    return list_.updated_at, list_.id
+
+
+def make_cursor(list_):
+    """
+    Returns the cursor of the page that starts after `list_`
+    """
+    microseconds = (list_.updated_at - EPOCH) // timedelta(microseconds=1)
+    return f"{microseconds}_{list_.id}"
+
+
+def parse_cursor(cursor):
+    """
+    Reverses make_cursor. Raises ValueError for malformed cursors.
+    """
+    microseconds, list_id = cursor.split("_")
+    return EPOCH + timedelta(microseconds=int(microseconds)), int(list_id)
+
+
+def owner_lists(owner_id, cursor=None, page_size=None):
+    """
+    Returns a page of the lists of the owner, most recently updated first,
+    and the cursor of the next page, None on the last one
+    """
+    page_size = page_size or settings.LIST_PAGE_SIZE
+    after = Q()
+    if cursor is not None:
+        updated_at, list_id = parse_cursor(cursor)
+        after = Q(updated_at__lt=updated_at) | Q(updated_at=updated_at, id__lt=list_id)
+
+    shards = [
+        List.objects.using(alias)
+        .filter(after, owner_id=owner_id)
+        .order_by("-updated_at", "-id")[: page_size + 1]
+        for alias in settings.LIST_SHARDS
+    ]
+    # One more list tells whether there is a next page
+    merged = heapq.merge(*shards, key=_order, reverse=True)
+    lists = list(islice(merged, page_size + 1))
+
+    page = lists[:page_size]
+    next_cursor = make_cursor(page[-1]) if len(lists) > page_size else None
+    return page, next_cursor
+
+
+def _count_key(owner_id):
+    return f"lists:count:{owner_id}"
+
+
+def count_lists(owner_id):
+    """
+    Returns how many lists the owner has, from the cache when it can
+    """
+
+    def count():
+        return sum(
+            List.objects.using(alias).filter(owner_id=owner_id).count()
+            for alias in settings.LIST_SHARDS
+        )
+
+    return cache.get_or_set(
+        _count_key(owner_id), count, settings.LIST_COUNT_CACHE_SECONDS
+    )
+
+
+def forget_count(owner_id):
+    """
+    Drops the cached count of the owner's lists, after it changed
+    """
+    cache.delete(_count_key(owner_id))
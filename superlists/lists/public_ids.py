@@ -0,0 +1,47 @@
+"""
+Public identifiers for lists.
+
+A public id is a 128 bit number written in base62 with a fixed width of 22
+characters. The first 48 bits are the creation time in milliseconds, so ids
+sort by creation time, and the other 80 bits are random, so ids can't be
+guessed from one another.
+"""
+import secrets
+import time
+
+ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+LENGTH = 22
+RANDOM_BITS = 80
+
+
+def encode(number):
+    """
+    Writes `number` in base62, padded to the width of a public id
+    """
+    digits = []
+    while number:
+        number, digit = divmod(number, 62)
+        digits.append(ALPHABET[digit])
+    return "".join(reversed(digits)).rjust(LENGTH, ALPHABET[0])
+
+
+def new_public_id():
+    """
+    Returns a new, time ordered, public id
+    """
+    milliseconds = int(time.time() * 1000)
+    return encode((milliseconds << RANDOM_BITS) | secrets.randbits(RANDOM_BITS))
+
+
+class PublicIdConverter:
+    """
+    URL converter for public ids
+    """
+
+    regex = f"[{ALPHABET}]{{{LENGTH}}}"
+
+    def to_python(self, value):
+        return value
+
+    def to_url(self, value):
+        return value
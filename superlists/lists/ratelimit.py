@@ -0,0 +1,203 @@
+"""
+Token bucket rate limiting for the views that write to the database.
+
+Every client gets one bucket per scope for its IP address and another one
+for its session, if it has any. Each request takes a token from both
+buckets, or a token per item for the views that add many at once, and the
+buckets refill at a constant rate up to their capacity.
+
+The bucket state lives in a backend. `MemoryBackend` keeps it inside the
+process, which is fine for `runserver` and the tests. `SQLiteBackend` keeps
+it in a local SQLite file, so every gunicorn worker on a host shares it.
+"""
+import math
+import os
+import sqlite3
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.http import HttpResponse
+from django.utils.module_loading import import_string
+
+
+def take_token(tokens, updated, capacity, rate, now, cost=1):
+    """
+    Refills a bucket that had `tokens` at `updated` and tries to take
+    `cost` tokens from it at `now`.
+
+    Returns the new amount of tokens and how many seconds the client has to
+    wait before retrying. That wait is zero when the tokens were granted.
+    """
+    tokens = min(capacity, tokens + (now - updated) * rate)
+    if tokens >= cost:
+        return tokens - cost, 0
+    return tokens, (cost - tokens) / rate
+
+
+class MemoryBackend:
+    """
+    Keeps the buckets in a dict. Each process has its own buckets.
+    """
+
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def consume(self, key, capacity, rate, cost=1):
+        """
+        Takes `cost` tokens from the bucket `key`. Returns the seconds to
+        wait before retrying, zero if they were granted.
+        """
+        now = time.monotonic()
+        with self.lock:
+            tokens, updated = self.buckets.pop(key, (capacity, now))
+            tokens, retry_after = take_token(tokens, updated, capacity, rate, now, cost)
+            # The dict keeps insertion order, so its first key is the bucket
+            # that was used the longest time ago
+            if len(self.buckets) >= self.max_keys:
+                del self.buckets[next(iter(self.buckets))]
+            self.buckets[key] = (tokens, now)
+        return retry_after
+
+
+class SQLiteBackend:
+    """
+    Keeps the buckets in a SQLite file shared by every process on the host.
+
+    `BEGIN IMMEDIATE` takes the file's write lock before reading a bucket,
+    so two workers can't grant the same token.
+    """
+
+    def __init__(self, path=None, timeout=5):
+        self.path = path or os.path.join(settings.BASE_DIR, "ratelimit.sqlite3")
+        self.timeout = timeout
+        self.local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(
+                self.path, timeout=self.timeout, isolation_level=None
+            )
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS buckets "
+                "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+            )
+            self.local.connection = connection
+        return connection
+
+    def consume(self, key, capacity, rate, cost=1):
+        """
+        Takes `cost` tokens from the bucket `key`. Returns the seconds to
+        wait before retrying, zero if they were granted.
+        """
+        connection = self._connection()
+        # time.time() instead of monotonic, since the clock must be the same
+        # for every process
+        now = time.time()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute(
+                "SELECT tokens, updated FROM buckets WHERE key = ?", (key,)
+            ).fetchone()
+            tokens, updated = row or (capacity, now)
+            tokens, retry_after = take_token(tokens, updated, capacity, rate, now, cost)
+            connection.execute(
+                "INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)",
+                (key, tokens, now),
+            )
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+        return retry_after
+
+
+_backend = None
+
+
+def get_backend():
+    """
+    Returns the backend configured by `RATELIMIT_BACKEND`, creating it on
+    the first call
+    """
+    global _backend  # pylint: disable=global-statement
+    if _backend is None:
+        backend_class = import_string(settings.RATELIMIT_BACKEND)
+        _backend = backend_class(**settings.RATELIMIT_OPTIONS)
+    return _backend
+
+
+@receiver(setting_changed)
+def reset_backend(setting, **kwargs):  # pylint: disable=unused-argument
+    """
+    Drops the current backend when the tests override its settings
+    """
+    global _backend  # pylint: disable=global-statement
+    if setting.startswith("RATELIMIT_"):
+        _backend = None
+
+
+def client_ip(request):
+    """
+    Returns the IP address of the client. Behind a proxy the address comes
+    from the header named by `RATELIMIT_IP_HEADER`.
+    """
+    if settings.RATELIMIT_IP_HEADER:
+        return request.META.get(settings.RATELIMIT_IP_HEADER, "")
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def check_rate(request, scope, cost=1):
+    """
+    Takes `cost` tokens from every bucket of the client for the given scope.
+
+    Returns the seconds the client has to wait, zero if it may go on.
+    """
+    capacity, rate = settings.RATELIMIT_RATES[scope]
+    keys = [f"{scope}:ip:{client_ip(request)}"]
+
+    session = getattr(request, "session", None)
+    if session is not None and session.session_key:
+        keys.append(f"{scope}:session:{session.session_key}")
+
+    backend = get_backend()
+    return max(backend.consume(key, capacity, rate, cost) for key in keys)
+
+
+def too_many_requests(retry_after):
+    """
+    Builds the HTTP-429 response asking the client to retry later
+    """
+    response = HttpResponse(
+        "Too many requests, please try again later.",
+        content_type="text/plain",
+        status=429,
+    )
+    response["Retry-After"] = str(math.ceil(retry_after))
+    return response
+
+
+def ratelimit(scope, methods=("POST",)):
+    """
+    Decorator that limits the requests of the given methods to a view.
+    The size and refill rate of the buckets come from `RATELIMIT_RATES`.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapped_view(request, *args, **kwargs):
+            if settings.RATELIMIT_ENABLED and request.method in methods:
+                retry_after = check_rate(request, scope)
+                if retry_after:
+                    return too_many_requests(retry_after)
+            return view(request, *args, **kwargs)
+
+        return wrapped_view
+
+    return decorator
@@ -0,0 +1,69 @@
+"""
+Database router that sends lists, and what belongs to them, to their shard
+"""
+from django.conf import settings
+
+from lists.sharding import is_sharded, shard_for_list
+
+SHARDED_MODELS = ("list", "item", "itembatch", "archivedlist", "backfillprogress")
+
+
+def shard_of(db):
+    """
+    Returns the shard that the database alias `db` holds, which is `default`
+    for its replicas
+    """
+    return "default" if db in settings.DATABASE_REPLICAS else db
+
+
+class ListShardRouter:
+    """
+    Routes the lists app models to the shard of their list.
+
+    The shard comes from the instance being saved or read through, or from
+    the `public_id` hint set by `ShardedManager.in_shard_of`. Anything else
+    is left to the next router, and so are the reads of the `default`
+    shard, which can go to its replicas.
+    """
+
+    def _db_for(self, model, hints):
+        if model._meta.app_label != "lists" or not is_sharded():
+            return None
+        if model._meta.model_name == "listidblock":
+            return settings.LIST_ID_DATABASE
+
+        instance = hints.get("instance")
+        if instance is not None:
+            # Objects stay in the database they were loaded from. Items and
+            # archives get it from their list when it's assigned to them
+            if instance._state.db:
+                return instance._state.db
+            public_id = getattr(instance, "public_id", None)
+        else:
+            public_id = hints.get("public_id")
+
+        if public_id is None:
+            return None
+        return shard_for_list(public_id)
+
+    def db_for_read(self, model, **hints):
+        db = self._db_for(model, hints)
+        return None if db == "default" else db
+
+    def db_for_write(self, model, **hints):
+        return self._db_for(model, hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if not is_sharded():
+            return None
+        if obj1._meta.app_label == "lists" and obj2._meta.app_label == "lists":
+            return shard_of(obj1._state.db) == shard_of(obj2._state.db)
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == "default" or db not in settings.LIST_SHARDS:
+            return None
+        # The other shards only hold lists, what belongs to them and the
+        # progress of the backfills run on them
+        model_name = model_name or hints.get("model_name")
+        return app_label == "lists" and model_name in SHARDED_MODELS
@@ -0,0 +1,158 @@
+"""
+Hash sharding of lists across the databases in `LIST_SHARDS`.
+
+A list and everything that belongs to it (its items and its archive) live in
+the shard picked by a hash of the list's public id, which is all a URL
+carries. List ids still come from a counter in `LIST_ID_DATABASE`, so they
+are unique across shards. They are handed out in blocks of
+`LIST_ID_BLOCK_SIZE`, so creating a list rarely touches the counter. The
+counter starts after the highest id found in the shards the first time it's
+needed.
+
+The shard is picked with a jump consistent hash, so appending a shard to
+`LIST_SHARDS` only moves the lists that now belong to the new shard. Run the
+`rebalance_shards` command after changing `LIST_SHARDS`.
+"""
+import hashlib
+import threading
+
+from django.conf import settings
+from django.db import IntegrityError, connections, transaction
+from django.db.models import F, Max
+
+from lists.models import ArchivedList, Item, ItemBatch, List, ListIdBlock
+
+
+def jump_hash(key, buckets):
+    """
+    Jump consistent hash by Lamping and Veach. Maps `key` to one of
+    `buckets` buckets, moving as few keys as possible when buckets are added.
+    """
+    bucket, jump = -1, 0
+    while jump < buckets:
+        bucket = jump
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        jump = int((bucket + 1) * ((1 << 31) / ((key >> 33) + 1)))
+    return bucket
+
+
+def is_sharded():
+    """
+    Are lists spread over more than one database?
+    """
+    return len(settings.LIST_SHARDS) > 1
+
+
+def shard_for_list(public_id):
+    """
+    Returns the database alias of the shard that holds the list with the
+    given public id
+    """
+    digest = hashlib.blake2b(public_id.encode(), digest_size=8).digest()
+    shards = settings.LIST_SHARDS
+    return shards[jump_hash(int.from_bytes(digest, "big"), len(shards))]
+
+
+def last_list_id():
+    """
+    Returns the highest List id in any shard
+    """
+    return max(
+        List.objects.using(alias).aggregate(Max("id"))["id__max"] or 0
+        for alias in settings.LIST_SHARDS
+    )
+
+
+class ListIdAllocator:
+    """
+    Hands out List ids from blocks reserved in the ListIdBlock counter
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.block = iter(())
+
+    def reserve_block(self):
+        """
+        Moves the counter forward by a block and returns the ids in it
+        """
+        size = settings.LIST_ID_BLOCK_SIZE
+        counter = ListIdBlock.objects.using(settings.LIST_ID_DATABASE)
+        try:
+            with transaction.atomic(using=settings.LIST_ID_DATABASE):
+                # The UPDATE locks the row until the end of the transaction
+                if not counter.filter(pk=1).update(next_id=F("next_id") + size):
+                    counter.create(pk=1, next_id=last_list_id() + 1 + size)
+                next_id = counter.get(pk=1).next_id
+        except IntegrityError:
+            # Another process created the counter first
+            return self.reserve_block()
+        return iter(range(next_id - size, next_id))
+
+    def allocate(self):
+        """
+        Returns an unused List id
+        """
+        with self.lock:
+            list_id = next(self.block, None)
+            if list_id is None:
+                self.block = self.reserve_block()
+                list_id = next(self.block)
+        return list_id
+
+
+allocator = ListIdAllocator()
+
+
+def allocate_list_id():
+    """
+    Returns an unused List id from the allocator of this process
+    """
+    return allocator.allocate()
+
+
+def move_list(list_id, source, target):
+    """
+    Copies a list, its items, the ids of its batches and its archive from
+    the `source` shard to the `target` one, then deletes them from `source`.
+
+    The copy commits before the deletion. If the deletion fails, running the
+    move again replaces the copy.
+
+    Workers still running with the old `LIST_SHARDS` add items to the list
+    in `source`, so it's locked until the move commits: those items either
+    make it into the copy or wait for the list to be gone.
+    """
+    with transaction.atomic(using=source), transaction.atomic(using=target):
+        lists = List.objects.using(source)
+        if connections[source].vendor == "sqlite":
+            # SQLite has no row locks, but a write takes the lock of the
+            # whole database
+            lists.filter(id=list_id).update(archived=F("archived"))
+        # Elsewhere, the row lock blocks the foreign key check of new items
+        list_ = lists.select_for_update().get(id=list_id)
+        items = Item.objects.using(source).filter(list_id=list_id).order_by("id")
+        archive = ArchivedList.objects.using(source).filter(list_id=list_id).first()
+
+        List.objects.using(target).filter(id=list_id).delete()
+        list_.save(using=target, force_insert=True)
+        # Item ids are only unique within a shard, so the copies get new ones
+        Item.objects.using(target).bulk_create(
+            Item(list_id=list_id, text=text)
+            for text in items.values_list("text", flat=True)
+        )
+        ItemBatch.objects.using(target).bulk_create(
+            ItemBatch(list_id=list_id, batch_id=batch_id)
+            for batch_id in ItemBatch.objects.using(source)
+            .filter(list_id=list_id)
+            .values_list("batch_id", flat=True)
+        )
+        if archive is not None:
+            ArchivedList.objects.using(target).create(
+                list_id=list_id, items=archive.items
+            )
+            ArchivedList.objects.using(target).filter(list_id=list_id).update(
+                archived_at=archive.archived_at
+            )
+
+        List.objects.using(source).filter(id=list_id).delete()
@@ -0,0 +1,54 @@
+// The pages are served without a CSRF token, so shared caches can keep them.
+// The token comes from /lists/csrf, which also sets the CSRF cookie, and goes
+// into the forms before they are sent. Scripts that post themselves get it
+// from window.csrfToken(). It's only fetched once a form is about to be used,
+// so reading a page costs no request besides the page itself.
+(function () {
+    "use strict";
+
+    function fetchToken() {
+        return fetch("/lists/csrf", { credentials: "same-origin" })
+            .then(function (response) {
+                return response.json();
+            })
+            .then(function (data) {
+                return data.token;
+            });
+    }
+
+    var token = null;
+    // Returns a promise of the token, fetching it on the first call, again
+    // if it failed, like on pages opened offline, or if `renew` is set
+    window.csrfToken = function (renew) {
+        token = !token || renew ? fetchToken() : token.catch(fetchToken);
+        return token;
+    };
+
+    var forms = document.querySelectorAll("form");
+    Array.prototype.forEach.call(forms, function (form) {
+        var input = form.querySelector("input[name=csrfmiddlewaretoken]");
+        if (!input) {
+            return;
+        }
+        // Typing in the form leaves time for the token to arrive
+        form.addEventListener("focusin", function () {
+            window
+                .csrfToken()
+                .then(function (value) {
+                    input.value = value;
+                })
+                .catch(function () {});
+        });
+        // Forms sent before the token arrived wait for it
+        form.addEventListener("submit", function (event) {
+            if (input.value) {
+                return;
+            }
+            event.preventDefault();
+            window.csrfToken().then(function (value) {
+                input.value = value;
+                form.submit();
+            });
+        });
+    });
+})();
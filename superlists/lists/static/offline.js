@@ -0,0 +1,242 @@
+// Lets the list pages take new items without a connection. Items typed into
+// the form show up at once and are queued in localStorage, then sent to the
+// server in batches, in order, whenever it can be reached. The service worker
+// keeps the pages, so lists open offline too.
+//
+// Each batch gets an id before it's first sent and keeps it until the server
+// answers, so a batch sent again after its response was lost isn't added
+// twice. Only one tab sends the queue of a list at a time.
+(function () {
+    "use strict";
+
+    if ("serviceWorker" in navigator) {
+        navigator.serviceWorker.register("/sw.js").catch(function () {});
+    }
+
+    var table = document.getElementById("id_list_table");
+    var url = table && table.getAttribute("data-items-url");
+    if (!url || !window.localStorage) {
+        return;
+    }
+    var batchSize = parseInt(table.getAttribute("data-batch-size"), 10);
+    var form = document.querySelector("form");
+    var input = form.querySelector("input[name=text]");
+    var key = "queue:" + url;
+    // The id and size of the batch at the head of the queue, once sent
+    var batchKey = "batch:" + url;
+    var lockName = "send:" + url;
+    // Items typed in a row go in the same batch
+    var SEND_DELAY = 500;
+    var RETRY_DELAY = 10000;
+    // How long a tab without navigator.locks holds the queue at most
+    var LEASE = 60000;
+    var timer = null;
+    var sending = false;
+    // Whether the CSRF token was renewed since the last batch went through
+    var renewed = false;
+
+    function read(name) {
+        try {
+            return JSON.parse(localStorage.getItem(name));
+        } catch (error) {
+            return null;
+        }
+    }
+
+    function queued() {
+        return read(key) || [];
+    }
+
+    function store(items) {
+        if (items.length) {
+            localStorage.setItem(key, JSON.stringify(items));
+        } else {
+            localStorage.removeItem(key);
+        }
+    }
+
+    function newId() {
+        if (window.crypto && crypto.randomUUID) {
+            return crypto.randomUUID();
+        }
+        return Date.now().toString(36) + Math.random().toString(36).slice(2);
+    }
+
+    // Returns the batch at the head of the queue, with the id it was first
+    // sent with
+    function headBatch() {
+        var items = queued();
+        var batch = read(batchKey);
+        if (!batch || !batch.count || batch.count > items.length) {
+            batch = { id: newId(), count: Math.min(items.length, batchSize) };
+            localStorage.setItem(batchKey, JSON.stringify(batch));
+        }
+        batch.items = items.slice(0, batch.count);
+        return batch;
+    }
+
+    function dropBatch(batch) {
+        store(queued().slice(batch.count));
+        localStorage.removeItem(batchKey);
+    }
+
+    function show(text) {
+        var row = table.insertRow(-1);
+        row.className = "text-muted";
+        row.insertCell(0).textContent = table.rows.length + ": " + text;
+    }
+
+    function pendingRows(count) {
+        var pending = table.querySelectorAll("tr.text-muted");
+        return Array.prototype.slice.call(pending, 0, count);
+    }
+
+    function shown(count) {
+        pendingRows(count).forEach(function (row) {
+            row.className = "";
+        });
+    }
+
+    // Marks the items of a batch the server turned down. `errors` has the
+    // reasons of the items that were invalid, by their index in the batch
+    function failed(count, errors) {
+        pendingRows(count).forEach(function (row, index) {
+            var reasons = errors[index] || errors[String(index)];
+            row.className = "text-danger";
+            row.cells[0].textContent +=
+                " (not saved" + (reasons ? ": " + reasons.join(" ") : "") + ")";
+        });
+    }
+
+    function schedule(delay) {
+        clearTimeout(timer);
+        timer = setTimeout(send, delay);
+    }
+
+    // Runs `work` unless another tab is sending the queue. Resolves to false
+    // when it didn't run
+    function exclusively(work) {
+        if (navigator.locks) {
+            return navigator.locks.request(
+                lockName,
+                { ifAvailable: true },
+                function (lock) {
+                    return lock ? work() : false;
+                }
+            );
+        }
+        var now = Date.now();
+        if (parseInt(localStorage.getItem(lockName), 10) > now) {
+            return Promise.resolve(false);
+        }
+        localStorage.setItem(lockName, String(now + LEASE));
+        function release(result) {
+            localStorage.removeItem(lockName);
+            return result;
+        }
+        return work().then(release, function (error) {
+            release();
+            throw error;
+        });
+    }
+
+    function post(batch, token) {
+        return fetch(url, {
+            method: "POST",
+            credentials: "same-origin",
+            headers: {
+                "Content-Type": "application/json",
+                "X-CSRFToken": token,
+            },
+            body: JSON.stringify({ id: batch.id, items: batch.items }),
+        });
+    }
+
+    // Acts on the answer to `batch`. Returns how long to wait before
+    // sending the next batch
+    function received(batch, response) {
+        if (response.ok) {
+            renewed = false;
+            dropBatch(batch);
+            shown(batch.count);
+            return 0;
+        }
+        if (response.status === 403) {
+            // The CSRF cookie expired. If a fresh token didn't help either,
+            // retrying at once would only spin
+            window.csrfToken(true);
+            var delay = renewed ? RETRY_DELAY : 0;
+            renewed = true;
+            return delay;
+        }
+        if (response.status === 429 || response.status >= 500) {
+            var retryAfter = response.headers.get("Retry-After");
+            return retryAfter ? retryAfter * 1000 : RETRY_DELAY;
+        }
+        // Turned down, like invalid items or a list that's gone. Sending it
+        // again would never go through, so the user is told instead
+        return response
+            .json()
+            .catch(function () {
+                return {};
+            })
+            .then(function (data) {
+                dropBatch(batch);
+                failed(batch.count, data.errors || {});
+                return 0;
+            });
+    }
+
+    function send() {
+        if (sending || !queued().length || !navigator.onLine) {
+            return;
+        }
+        sending = true;
+        exclusively(function () {
+            var batch = headBatch();
+            return window
+                .csrfToken()
+                .then(function (token) {
+                    return post(batch, token);
+                })
+                .then(function (response) {
+                    return received(batch, response);
+                });
+        })
+            .then(function (delay) {
+                sending = false;
+                // Another tab is sending the queue, this one takes over if
+                // it's closed
+                schedule(delay === false ? RETRY_DELAY : delay);
+            })
+            .catch(function () {
+                sending = false;
+                schedule(RETRY_DELAY);
+            });
+    }
+
+    // Runs before the handler of csrf.js, so the form isn't posted
+    document.addEventListener(
+        "submit",
+        function (event) {
+            var text = input.value.trim();
+            if (event.target !== form || !text) {
+                return;
+            }
+            event.preventDefault();
+            event.stopPropagation();
+            store(queued().concat([text]));
+            show(text);
+            input.value = "";
+            schedule(SEND_DELAY);
+        },
+        true
+    );
+    window.addEventListener("online", function () {
+        schedule(0);
+    });
+
+    // Items queued on an earlier visit
+    queued().forEach(show);
+    schedule(0);
+})();
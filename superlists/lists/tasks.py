@@ -0,0 +1,34 @@
+"""
+Background tasks of the Lists app
+"""
+from lists import archive, deletion
+from lists.models import List
+from lists.sharding import shard_for_list
+from tasks.queue import task
+
+
+@task
+def delete_list(list_id, using):
+    """
+    Deletes a list and its items, in batches
+    """
+    deletion.delete_list(list_id, using)
+
+
+@task
+def archive_list(list_id, using):
+    """
+    Archives an idle list
+    """
+    archive.archive_list(list_id, using)
+
+
+@task
+def restore_list(public_id):
+    """
+    Puts the items of an archived list back into Item
+    """
+    shard = shard_for_list(public_id)
+    list_ = List.objects.using(shard).filter(public_id=public_id).first()
+    if list_ is not None and list_.archived:
+        archive.restore_list(list_)
@@ -0,0 +1,80 @@
+{% load static %}// Service worker of the offline client. The home page and the lists come
+// from the network when it answers and from the cache otherwise, and static
+// files from the cache while it's refreshed behind them. Other pages, like
+// the admin or the lists of a user, are never kept. Items typed offline are
+// queued by offline.js.
+"use strict";
+
+// Bumping the version drops everything the older workers kept
+var CACHE = "superlists-v2";
+var STATIC_URL = "{% static "" %}";
+var OFFLINE_PAGES = new RegExp("{{ offline_pages|escapejs }}");
+
+self.addEventListener("install", function () {
+    self.skipWaiting();
+});
+
+self.addEventListener("activate", function (event) {
+    event.waitUntil(
+        caches
+            .keys()
+            .then(function (names) {
+                return Promise.all(
+                    names
+                        .filter(function (name) {
+                            return name !== CACHE;
+                        })
+                        .map(function (name) {
+                            return caches.delete(name);
+                        })
+                );
+            })
+            .then(function () {
+                return self.clients.claim();
+            })
+    );
+});
+
+function keepable(response) {
+    var cacheControl = response.headers.get("Cache-Control") || "";
+    return response.ok && !/private|no-store/.test(cacheControl);
+}
+
+function fetchAndKeep(request) {
+    return fetch(request).then(function (response) {
+        if (keepable(response)) {
+            var copy = response.clone();
+            caches.open(CACHE).then(function (cache) {
+                cache.put(request, copy);
+            });
+        }
+        return response;
+    });
+}
+
+self.addEventListener("fetch", function (event) {
+    var request = event.request;
+    var url = new URL(request.url);
+    if (request.method !== "GET" || url.origin !== self.location.origin) {
+        return;
+    }
+
+    if (request.mode === "navigate" && OFFLINE_PAGES.test(url.pathname)) {
+        event.respondWith(
+            fetchAndKeep(request).catch(function () {
+                return caches.match(request);
+            })
+        );
+    } else if (url.pathname.indexOf(STATIC_URL) === 0) {
+        event.respondWith(
+            caches.match(request).then(function (cached) {
+                var fresh = fetchAndKeep(request);
+                if (cached) {
+                    fresh.catch(function () {});
+                    return cached;
+                }
+                return fresh;
+            })
+        );
+    }
+});
@@ -0,0 +1,41 @@
+"""
+Factories and base test cases for the unit tests
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from lists.models import Item, List
+
+# For the tests that expect every list in `default`. With SUPERLISTS_SHARD_DBS
+# set the lists would be spread over the shards, which ShardedListsTest covers
+single_shard = override_settings(LIST_SHARDS=["default"])
+
+# The databases of the tests that use every shard. Unlike "__all__", it
+# leaves out the replicas: their connections can't see the writes of a
+# TestCase, which are never committed
+SHARD_DATABASES = set(settings.LIST_SHARDS)
+
+
+class EveryShardTestCase(TestCase):
+    """
+    TestCase for the tests whose lists, or the queries about them, can be
+    in any shard
+    """
+
+    databases = SHARD_DATABASES
+
+
+def make_list(*texts, idle_days=0):
+    """
+    Creates a list with the given items, last visited `idle_days` ago
+    """
+    list_ = List.objects.create(
+        last_accessed=timezone.now() - timedelta(days=idle_days)
+    )
+    Item.objects.in_shard_of(list_.public_id).bulk_create(
+        Item(list=list_, text=text) for text in texts
+    )
+    return list_
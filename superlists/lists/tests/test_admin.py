@@ -0,0 +1,92 @@
+"""
+Unit tests for the admin of the Lists app
+"""
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from lists.admin import ListAdmin, estimated_count
+from lists.models import Item, List
+from lists.tests.factories import make_list, single_shard
+
+
+@single_shard
+class EstimatedCountTest(TestCase):
+    """
+    Tests for the capped counts of the changelists
+    """
+
+    def test_small_tables_are_counted(self):
+        make_list()
+        make_list()
+        self.assertEqual(estimated_count(List.objects.all(), 10), (2, True))
+
+    def test_counting_stops_at_the_limit(self):
+        for _ in range(3):
+            make_list()
+        self.assertEqual(estimated_count(List.objects.all(), 2), (2, False))
+
+
+@single_shard
+class ChangeListTest(TestCase):
+    """
+    Tests for the keyset paged changelists
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            "admin", "admin@example.com", "secret"
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    @patch.object(ListAdmin, "list_per_page", 2)
+    def test_pages_by_primary_key(self):
+        lists = [make_list() for _ in range(3)]
+
+        response = self.client.get("/admin/lists/list/")
+        self.assertEqual(
+            [list_.id for list_ in response.context["cl"].result_list],
+            [lists[2].id, lists[1].id],
+        )
+        self.assertContains(response, f"?before={lists[1].id}")
+
+        response = self.client.get(f"/admin/lists/list/?before={lists[1].id}")
+        self.assertEqual(
+            [list_.id for list_ in response.context["cl"].result_list], [lists[0].id]
+        )
+        self.assertContains(response, "Newest")
+        self.assertContains(response, "3 lists")
+
+    def test_bad_cursors_are_rejected(self):
+        response = self.client.get("/admin/lists/list/?before=nope")
+        self.assertRedirects(response, "/admin/lists/list/?e=1")
+
+    def test_search_by_public_id(self):
+        list_ = make_list("wanted")
+        make_list("other")
+
+        response = self.client.get(f"/admin/lists/item/?q={list_.public_id}")
+
+        self.assertEqual(
+            [item.text for item in response.context["cl"].result_list], ["wanted"]
+        )
+
+    def test_item_changelist_queries_dont_grow_with_the_page(self):
+        def count_queries():
+            with CaptureQueriesContext(connection) as context:
+                self.client.get("/admin/lists/item/")
+            return len(context)
+
+        make_list("one")
+        few = count_queries()
+        for _ in range(10):
+            make_list("more", "items")
+
+        self.assertEqual(count_queries(), few)
+        self.assertEqual(Item.objects.count(), 21)
@@ -0,0 +1,167 @@
+"""
+Unit tests for the archival of abandoned lists
+"""
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from lists.access import AccessTracker
+from lists.archive import archive_list, pack_items, restore_list
+from lists.models import ArchivedList, Item, List
+from lists.tests.factories import make_list, single_shard
+from tasks.models import Task
+from tasks.queue import Worker
+
+
+@single_shard
+class AccessTrackerTest(TestCase):
+    """
+    Tests for the batched last-accessed tracking
+    """
+
+    def test_recent_visits_are_not_recorded(self):
+        tracker = AccessTracker(resolution=3600, flush_interval=0)
+        tracker.touch(make_list())
+        self.assertEqual(tracker.pending, {})
+
+    def test_visits_are_written_in_batches(self):
+        tracker = AccessTracker(resolution=3600, flush_interval=3600)
+        first_list = make_list(idle_days=10)
+        second_list = make_list(idle_days=10)
+
+        tracker.touch(first_list)
+        tracker.touch(second_list)
+
+        # Nothing is written until the flush
+        first_list.refresh_from_db()
+        self.assertLess(first_list.last_accessed, timezone.now() - timedelta(days=9))
+
+        with self.assertNumQueries(1):
+            tracker.flush()
+        for list_ in (first_list, second_list):
+            list_.refresh_from_db()
+            self.assertGreater(list_.last_accessed, timezone.now() - timedelta(days=1))
+
+
+@single_shard
+class ArchiveTest(TestCase):
+    """
+    Tests for archiving and restoring a list
+    """
+
+    def test_archiving_moves_the_items_out(self):
+        list_ = make_list("one", "two")
+        self.assertTrue(archive_list(list_.id, "default"))
+
+        list_.refresh_from_db()
+        self.assertTrue(list_.archived)
+        self.assertEqual(Item.objects.count(), 0)
+        self.assertEqual(ArchivedList.objects.count(), 1)
+
+        # A list can only be archived once
+        self.assertFalse(archive_list(list_.id, "default"))
+
+    def test_items_added_while_archiving_are_kept(self):
+        list_ = make_list("one", "two")
+
+        def pack_and_add(texts):
+            # Another request adds an item after the archiver read the others
+            Item.objects.create(list=list_, text="late")
+            return pack_items(texts)
+
+        with patch("lists.archive.pack_items", pack_and_add):
+            archive_list(list_.id, "default")
+
+        self.assertEqual(list(Item.objects.values_list("text", flat=True)), ["late"])
+
+    def test_restoring_keeps_the_items_order(self):
+        list_ = make_list("one", "two", "three")
+        archive_list(list_.id, "default")
+        list_.refresh_from_db()
+
+        restore_list(list_)
+
+        self.assertFalse(list_.archived)
+        self.assertEqual(ArchivedList.objects.count(), 0)
+        texts = Item.objects.filter(list=list_).order_by("id")
+        self.assertEqual(
+            list(texts.values_list("text", flat=True)), ["one", "two", "three"]
+        )
+
+    def test_view_shows_archived_lists_and_queues_their_restore(self):
+        list_ = make_list("hidden item")
+        archive_list(list_.id, "default")
+
+        response = self.client.get(f"/lists/{list_.public_id}/")
+
+        self.assertContains(response, "1: hidden item")
+        list_.refresh_from_db()
+        self.assertTrue(list_.archived)
+
+        Worker().work(burst=True)
+        list_.refresh_from_db()
+        self.assertFalse(list_.archived)
+
+    def test_visits_queue_a_single_restore(self):
+        list_ = make_list("hidden item")
+        archive_list(list_.id, "default")
+
+        self.client.get(f"/lists/{list_.public_id}/")
+        self.client.get(f"/lists/{list_.public_id}/")
+
+        self.assertEqual(
+            Task.objects.filter(name="lists.tasks.restore_list").count(), 1
+        )
+
+    def test_view_shows_lists_restored_since_they_were_read(self):
+        list_ = make_list("restored item")
+        # Read as archived, while another request restored it
+        List.objects.filter(id=list_.id).update(archived=True)
+
+        response = self.client.get(f"/lists/{list_.public_id}/")
+
+        self.assertContains(response, "1: restored item")
+        self.assertEqual(Task.objects.count(), 0)
+
+    def test_adding_items_restores_archived_lists(self):
+        list_ = make_list("hidden item")
+        archive_list(list_.id, "default")
+
+        self.client.post(f"/lists/{list_.public_id}/", {"text": "new item"})
+
+        texts = Item.objects.filter(list=list_).order_by("id")
+        self.assertEqual(
+            list(texts.values_list("text", flat=True)), ["hidden item", "new item"]
+        )
+
+
+@single_shard
+class ArchiveListsCommandTest(TestCase):
+    """
+    Tests for the archive_lists management command
+    """
+
+    def test_archives_only_idle_lists(self):
+        idle_list = make_list("old", idle_days=100)
+        active_list = make_list("new", idle_days=1)
+
+        output = StringIO()
+        call_command("archive_lists", idle_days=30, batch_size=1, stdout=output)
+
+        idle_list.refresh_from_db()
+        active_list.refresh_from_db()
+        self.assertTrue(idle_list.archived)
+        self.assertFalse(active_list.archived)
+        self.assertIn("Archived 1 lists", output.getvalue())
+
+    def test_limit(self):
+        for _ in range(3):
+            make_list("old", idle_days=100)
+
+        call_command("archive_lists", idle_days=30, limit=2, stdout=StringIO())
+
+        self.assertEqual(List.objects.filter(archived=True).count(), 2)
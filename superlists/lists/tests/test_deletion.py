@@ -0,0 +1,106 @@
+"""
+Unit tests for the batched deletion of lists
+"""
+from django.contrib.auth.models import Permission, User
+from django.db.models.signals import post_delete
+from django.test import TestCase
+
+from lists.archive import archive_list
+from lists.deletion import delete_list
+from lists.models import ArchivedList, Item, List
+from lists.tests.factories import make_list, single_shard
+from tasks.queue import Worker
+
+
+@single_shard
+class DeleteListTest(TestCase):
+    """
+    Tests for delete_list
+    """
+
+    def test_deletes_the_list_and_its_items(self):
+        list_ = make_list("a", "b", "c", "d", "e")
+        other_list = make_list("kept")
+
+        self.assertEqual(delete_list(list_.id, "default", batch_size=2), 5)
+
+        self.assertFalse(List.objects.filter(id=list_.id).exists())
+        self.assertEqual(
+            list(Item.objects.values_list("list", flat=True)), [other_list.id]
+        )
+
+    def test_deletes_the_archive(self):
+        list_ = make_list("a")
+        archive_list(list_.id, "default")
+
+        delete_list(list_.id, "default")
+
+        self.assertEqual(ArchivedList.objects.count(), 0)
+        self.assertEqual(List.objects.count(), 0)
+
+    def test_receivers_see_every_item(self):
+        list_ = make_list("a", "b", "c")
+        deleted = []
+
+        def receiver(instance, **kwargs):
+            deleted.append(instance.text)
+
+        post_delete.connect(receiver, sender=Item)
+        self.addCleanup(post_delete.disconnect, receiver, sender=Item)
+        delete_list(list_.id, "default", batch_size=2)
+
+        self.assertEqual(sorted(deleted), ["a", "b", "c"])
+
+
+@single_shard
+class ListAdminTest(TestCase):
+    """
+    Tests for the admin of lists
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            "admin", "admin@example.com", "secret"
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_delete_action_deletes_in_the_background(self):
+        list_ = make_list("a")
+
+        self.client.post(
+            "/admin/lists/list/",
+            {"action": "delete_in_batches", "_selected_action": [list_.id]},
+        )
+        self.assertEqual(List.objects.count(), 1)
+
+        Worker().work(burst=True)
+        self.assertEqual(List.objects.count(), 0)
+        self.assertEqual(Item.objects.count(), 0)
+
+    def test_delete_view_deletes_in_the_background(self):
+        list_ = make_list("a", "b")
+
+        self.client.post(f"/admin/lists/list/{list_.id}/delete/", {"post": "yes"})
+        self.assertEqual(List.objects.count(), 1)
+
+        Worker().work(burst=True)
+        self.assertEqual(List.objects.count(), 0)
+        self.assertEqual(Item.objects.count(), 0)
+
+    def test_deleting_items_needs_their_permission(self):
+        staff = User.objects.create_user("staff", password="secret", is_staff=True)
+        staff.user_permissions.set(
+            Permission.objects.filter(codename__in=["view_list", "delete_list"])
+        )
+        self.client.force_login(staff)
+        url = "/admin/lists/list/{}/delete/"
+
+        response = self.client.post(url.format(make_list("a").id), {"post": "yes"})
+        self.assertEqual(response.status_code, 403)
+
+        # Lists without items only need the permission to delete lists
+        response = self.client.post(url.format(make_list().id), {"post": "yes"})
+        self.assertEqual(response.status_code, 302)
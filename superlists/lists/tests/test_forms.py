@@ -5,8 +5,10 @@ from django.test import TestCase
 
 from lists.forms import EMPTY_ITEM_ERROR, ItemForm
 from lists.models import Item, List
+from lists.tests.factories import single_shard
 
 
+@single_shard
 class ItemFormTest(TestCase):
     """
     Tests for the form that manages list items
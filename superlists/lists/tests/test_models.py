@@ -5,8 +5,10 @@ from django.core.exceptions import ValidationError
 from django.test import TestCase
 
 from lists.models import Item, List
+from lists.tests.factories import single_shard
 
 
+@single_shard
 class ListAndItemModelTest(TestCase):
     """
     Unit tests for the list and item models combined.
@@ -71,4 +73,15 @@ class ListAndItemModelTest(TestCase):
         the URL to its representation
         """
         list_ = List.objects.create()
-        self.assertEqual(list_.get_absolute_url(), f"/lists/{list_.id}/")
+        self.assertEqual(list_.get_absolute_url(), f"/lists/{list_.public_id}/")
+
+    def test_lists_get_unique_public_ids(self):
+        """
+        Tests if every list gets its own public id, and if public ids
+        sort by creation time
+        """
+        first_list = List.objects.create()
+        second_list = List.objects.create()
+        self.assertEqual(len(first_list.public_id), 22)
+        self.assertNotEqual(first_list.public_id, second_list.public_id)
+        self.assertLessEqual(first_list.public_id[:7], second_list.public_id[:7])
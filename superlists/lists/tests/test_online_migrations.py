@@ -0,0 +1,200 @@
+"""
+Unit tests for the online migration toolkit
+"""
+from io import StringIO
+from unittest.mock import patch
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management import call_command
+from django.db import NotSupportedError, connection, models
+from django.db.migrations import Migration
+from django.db.migrations.state import ProjectState
+from django.db.models.functions import Upper
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from lists.models import BackfillProgress, Item
+from lists.online_migrations import (
+    AddIndexConcurrently,
+    AddNullableField,
+    EnforceNotNull,
+    RunBackfill,
+    run_backfill,
+)
+from lists.tests.factories import EveryShardTestCase, make_list, single_shard
+
+
+def upper_texts(queryset):
+    queryset.update(text=Upper("text"))
+
+
+def mark_done(queryset):
+    queryset.update(done=True)
+
+
+@single_shard
+class RunBackfillTest(TestCase):
+    """
+    Tests for the batched, resumable backfills
+    """
+
+    def backfill(self, **kwargs):
+        return run_backfill(
+            "upper_texts",
+            Item.objects.using("default"),
+            upper_texts,
+            BackfillProgress,
+            pause=0,
+            report=None,
+            **kwargs,
+        )
+
+    def texts(self):
+        return list(Item.objects.order_by("id").values_list("text", flat=True))
+
+    def test_updates_every_row_in_batches(self):
+        make_list("a", "b", "c", "d", "e")
+
+        progress = self.backfill(batch_size=2)
+
+        self.assertEqual(self.texts(), ["A", "B", "C", "D", "E"])
+        self.assertEqual(progress.rows_done, 5)
+        self.assertIsNotNone(progress.finished_at)
+
+    def test_resumes_after_the_last_row_done(self):
+        make_list("a", "b", "c")
+        first = Item.objects.order_by("id").first()
+        BackfillProgress.objects.create(name="upper_texts", last_pk=first.id)
+
+        self.backfill()
+
+        self.assertEqual(self.texts(), ["a", "B", "C"])
+
+    def test_finished_backfills_dont_run_again(self):
+        make_list("a")
+        self.backfill()
+        Item.objects.update(text="b")
+
+        with self.assertNumQueries(1):
+            self.backfill()
+        self.assertEqual(self.texts(), ["b"])
+
+
+class AddNullableFieldTest(TestCase):
+    """
+    Tests for the online addition of columns
+    """
+
+    def test_refuses_fields_that_rewrite_the_table(self):
+        with self.assertRaises(ValueError):
+            AddNullableField("item", "done", models.BooleanField(default=False))
+        with self.assertRaises(ValueError):
+            AddNullableField(
+                "item", "done", models.BooleanField(null=True, default=False)
+            )
+
+        AddNullableField("item", "done", models.BooleanField(null=True))
+
+
+@single_shard
+class OnlineOperationsTest(TransactionTestCase):
+    """
+    Applies the online operations through a migration, which takes the plain
+    Django path on SQLite
+    """
+
+    # Reads outside of transactions go to the replicas
+    databases = {"default", *settings.DATABASE_REPLICAS}
+
+    operations = [
+        AddNullableField("item", "done", models.BooleanField(null=True)),
+        RunBackfill("item_done", "item", mark_done, where={"done__isnull": True}),
+        EnforceNotNull("item", "done", models.BooleanField(default=False)),
+        AddIndexConcurrently(
+            "item", models.Index(fields=["done"], name="lists_item_done_idx")
+        ),
+    ]
+
+    def migration(self, operations):
+        migration = Migration("online", "lists")
+        migration.operations = operations
+        return migration
+
+    def columns(self):
+        with connection.cursor() as cursor:
+            description = connection.introspection.get_table_description(
+                cursor, Item._meta.db_table
+            )
+        return {column.name: column for column in description}
+
+    def indexes(self):
+        with connection.cursor() as cursor:
+            return connection.introspection.get_constraints(cursor, Item._meta.db_table)
+
+    def test_operations_apply_and_unapply(self):
+        make_list("a", "b", "c")
+        migration = self.migration(self.operations)
+        before = ProjectState.from_apps(apps)
+
+        with connection.schema_editor(atomic=False) as editor, patch("sys.stdout"):
+            after = migration.apply(before.clone(), editor)
+        try:
+            self.assertFalse(self.columns()["done"].null_ok)
+            self.assertIn("lists_item_done_idx", self.indexes())
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT COUNT(*) FROM lists_item WHERE done")
+                self.assertEqual(cursor.fetchone()[0], 3)
+            self.assertIsNotNone(
+                BackfillProgress.objects.get(name="item_done").finished_at
+            )
+
+            item = after.models["lists", "item"]
+            self.assertFalse(dict(item.fields)["done"].null)
+            self.assertEqual(item.options["indexes"][-1].name, "lists_item_done_idx")
+        finally:
+            with connection.schema_editor(atomic=False) as editor:
+                migration.unapply(after, editor)
+
+        self.assertNotIn("done", self.columns())
+        self.assertNotIn("lists_item_done_idx", self.indexes())
+        self.assertFalse(BackfillProgress.objects.filter(name="item_done").exists())
+
+    def test_backfills_refuse_to_run_in_a_transaction(self):
+        migration = self.migration(self.operations[:2])
+        with self.assertRaisesMessage(NotSupportedError, "atomic = False"):
+            with connection.schema_editor(atomic=True) as editor:
+                migration.apply(ProjectState.from_apps(apps), editor)
+        self.assertNotIn("done", self.columns())
+
+
+@single_shard
+class MigrationsTest(EveryShardTestCase):
+    """
+    Tests for the migrations of the lists app
+    """
+
+    # The fast test settings disable migrations
+    @override_settings(MIGRATION_MODULES={})
+    def test_models_match_migrations(self):
+        output = StringIO()
+        call_command("makemigrations", "lists", check=True, dry_run=True, stdout=output)
+        self.assertIn("No changes detected", output.getvalue())
+
+    def test_migration_progress_command(self):
+        # Left behind by the backfills in the migrations
+        BackfillProgress.objects.all().delete()
+        output = StringIO()
+        call_command("migration_progress", stdout=output)
+        self.assertIn("No backfills have run", output.getvalue())
+
+        make_list("a")
+        run_backfill(
+            "upper_texts",
+            Item.objects.all(),
+            upper_texts,
+            BackfillProgress,
+            pause=0,
+            report=None,
+        )
+        call_command("migration_progress", stdout=output)
+        self.assertIn("default: upper_texts: 1 rows, up to id", output.getvalue())
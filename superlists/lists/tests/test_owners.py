@@ -0,0 +1,208 @@
+"""
+Unit tests for the owners of lists
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from lists.archive import archive_list
+from lists.deletion import delete_list
+from lists.forms import ItemForm
+from lists.models import List
+from lists.owners import count_lists, make_cursor, owner_lists, parse_cursor
+from lists.tests.factories import make_list, single_shard
+from superlists import settings_slim
+
+
+@single_shard
+class OwnerTestCase(TestCase):
+    """
+    Creates a user, with an empty cache of list counts
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("owner", password="secret")
+
+    def setUp(self):
+        cache.clear()
+
+    def make_lists(self, count, owner_id=None):
+        """
+        Creates `count` lists of the owner, updated a minute apart, and
+        returns them newest first
+        """
+        now = timezone.now()
+        lists = []
+        for minutes in range(count):
+            list_ = make_list()
+            List.objects.filter(id=list_.id).update(
+                owner_id=owner_id or self.user.id,
+                updated_at=now - timedelta(minutes=minutes),
+            )
+            lists.append(list_)
+        return lists
+
+
+class OwnerListsTest(OwnerTestCase):
+    """
+    Tests for the pages of the lists of an owner
+    """
+
+    def test_pages_follow_the_last_update(self):
+        lists = self.make_lists(5)
+        self.make_lists(2, owner_id=self.user.id + 1)
+
+        page, cursor = owner_lists(self.user.id, page_size=2)
+        self.assertEqual([list_.id for list_ in page], [lists[0].id, lists[1].id])
+
+        page, cursor = owner_lists(self.user.id, cursor, page_size=2)
+        self.assertEqual([list_.id for list_ in page], [lists[2].id, lists[3].id])
+
+        page, cursor = owner_lists(self.user.id, cursor, page_size=2)
+        self.assertEqual([list_.id for list_ in page], [lists[4].id])
+        self.assertIsNone(cursor)
+
+    def test_lists_updated_together_are_not_skipped(self):
+        self.make_lists(3)
+        List.objects.update(updated_at=timezone.now())
+
+        first, cursor = owner_lists(self.user.id, page_size=2)
+        second, _ = owner_lists(self.user.id, cursor, page_size=2)
+
+        self.assertEqual(len({list_.id for list_ in first + second}), 3)
+
+    def test_a_page_takes_one_query_per_shard(self):
+        self.make_lists(30)
+        _, cursor = owner_lists(self.user.id, page_size=10)
+
+        with self.assertNumQueries(len(settings.LIST_SHARDS)):
+            owner_lists(self.user.id, cursor, page_size=10)
+
+    def test_cursors_round_trip(self):
+        list_ = self.make_lists(1)[0]
+        list_.refresh_from_db()
+        self.assertEqual(parse_cursor(make_cursor(list_)), (list_.updated_at, list_.id))
+
+    def test_the_count_is_cached(self):
+        self.make_lists(3)
+        self.assertEqual(count_lists(self.user.id), 3)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(count_lists(self.user.id), 3)
+
+
+class OwnershipTest(OwnerTestCase):
+    """
+    Tests for how lists get their owner and their last update
+    """
+
+    def test_new_lists_belong_to_the_signed_in_user(self):
+        self.client.force_login(self.user)
+        count_lists(self.user.id)
+
+        self.client.post("/lists/new", data={"text": "mine"})
+
+        self.assertEqual(List.objects.get().owner_id, self.user.id)
+        self.assertEqual(count_lists(self.user.id), 1)
+
+    def test_anonymous_lists_have_no_owner(self):
+        self.client.post("/lists/new", data={"text": "nobody's"})
+        self.assertIsNone(List.objects.get().owner_id)
+
+    def test_deleting_or_archiving_a_list_drops_the_count(self):
+        first, second = self.make_lists(2)
+        self.assertEqual(count_lists(self.user.id), 2)
+
+        archive_list(first.id, "default")
+        with self.assertNumQueries(1):
+            self.assertEqual(count_lists(self.user.id), 2)
+
+        delete_list(second.id, "default")
+        self.assertEqual(count_lists(self.user.id), 1)
+
+    @override_settings(
+        INSTALLED_APPS=settings_slim.INSTALLED_APPS,
+        MIDDLEWARE=settings_slim.MIDDLEWARE,
+    )
+    def test_the_web_workers_record_owners(self):
+        self.client.force_login(self.user)
+
+        self.client.post("/lists/new", data={"text": "mine"})
+        response = self.client.get("/lists/mine")
+
+        self.assertEqual(List.objects.get().owner_id, self.user.id)
+        self.assertContains(response, "1 list")
+
+    def test_saving_an_item_updates_the_list(self):
+        list_ = self.make_lists(1)[0]
+        list_.refresh_from_db()
+        before = list_.updated_at
+
+        form = ItemForm(data={"text": "new item"})
+        form.is_valid()
+        form.save(for_list=list_)
+
+        list_.refresh_from_db()
+        self.assertGreater(list_.updated_at, before)
+
+
+@override_settings(LIST_PAGE_SIZE=2)
+class MyListsViewTest(OwnerTestCase):
+    """
+    Tests for the page with the lists of the user
+    """
+
+    def test_needs_a_signed_in_user(self):
+        response = self.client.get("/lists/mine", follow=True)
+
+        self.assertEqual(
+            response.redirect_chain, [("/accounts/login/?next=/lists/mine", 302)]
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, "login.html")
+
+    @override_settings(
+        INSTALLED_APPS=settings_slim.INSTALLED_APPS,
+        MIDDLEWARE=settings_slim.MIDDLEWARE,
+    )
+    def test_signing_in_on_the_web_workers_leads_back_to_the_lists(self):
+        self.make_lists(1)
+
+        response = self.client.get("/lists/mine", follow=True)
+        self.assertContains(response, 'name="password"')
+
+        response = self.client.post(
+            "/accounts/login/",
+            data={"username": "owner", "password": "secret", "next": "/lists/mine"},
+            follow=True,
+        )
+        self.assertTemplateUsed(response, "my_lists.html")
+        self.assertContains(response, "1 list")
+
+    def test_shows_a_page_of_the_users_lists(self):
+        lists = self.make_lists(3)
+        self.client.force_login(self.user)
+
+        response = self.client.get("/lists/mine")
+
+        self.assertTemplateUsed(response, "my_lists.html")
+        self.assertEqual(response.context["lists"], lists[:2])
+        self.assertContains(response, "3 lists")
+        self.assertContains(response, lists[0].get_absolute_url())
+        self.assertContains(response, f'?before={response.context["next_cursor"]}')
+
+        response = self.client.get(
+            f'/lists/mine?before={response.context["next_cursor"]}'
+        )
+        self.assertEqual(response.context["lists"], lists[2:])
+        self.assertNotContains(response, "Older lists")
+
+    def test_bad_pages_are_rejected(self):
+        self.client.force_login(self.user)
+        response = self.client.get("/lists/mine?before=nope")
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,196 @@
+"""
+Unit tests for the rate limiter
+"""
+import json
+import os
+import tempfile
+
+from django.test import TestCase, override_settings
+
+from lists.models import Item, List
+from lists.ratelimit import MemoryBackend, SQLiteBackend, reset_backend, take_token
+from lists.tests.factories import single_shard
+from superlists import settings_slim
+
+
+class TokenBucketTest(TestCase):
+    """
+    Tests for the token bucket arithmetic
+    """
+
+    def test_full_bucket_grants_a_token(self):
+        tokens, retry_after = take_token(2, 0, capacity=2, rate=1, now=0)
+        self.assertEqual(tokens, 1)
+        self.assertEqual(retry_after, 0)
+
+    def test_empty_bucket_asks_to_wait_for_the_next_token(self):
+        tokens, retry_after = take_token(0.5, 0, capacity=2, rate=0.25, now=0)
+        self.assertEqual(tokens, 0.5)
+        # Half a token missing, at a quarter token per second
+        self.assertEqual(retry_after, 2)
+
+    def test_costly_requests_take_several_tokens(self):
+        tokens, retry_after = take_token(3, 0, capacity=3, rate=1, now=0, cost=2)
+        self.assertEqual(tokens, 1)
+        self.assertEqual(retry_after, 0)
+
+        tokens, retry_after = take_token(1, 0, capacity=3, rate=1, now=0, cost=2)
+        self.assertEqual(tokens, 1)
+        self.assertEqual(retry_after, 1)
+
+    def test_bucket_refills_up_to_its_capacity(self):
+        tokens, _ = take_token(0, 0, capacity=3, rate=1, now=100)
+        self.assertEqual(tokens, 2)
+
+
+class BackendTest(TestCase):
+    """
+    Both backends must run out of tokens at the same point
+    """
+
+    def assert_runs_out_after(self, backend, capacity):
+        for _ in range(capacity):
+            self.assertEqual(backend.consume("key", capacity, 0.001), 0)
+        self.assertGreater(backend.consume("key", capacity, 0.001), 0)
+        # Other keys have buckets of their own
+        self.assertEqual(backend.consume("other key", capacity, 0.001), 0)
+
+    def test_memory_backend(self):
+        self.assert_runs_out_after(MemoryBackend(), 3)
+
+    def test_memory_backend_forgets_the_oldest_bucket(self):
+        backend = MemoryBackend(max_keys=2)
+        for key in ("a", "b", "c"):
+            backend.consume(key, 1, 0.001)
+        self.assertEqual(list(backend.buckets), ["b", "c"])
+
+    def test_sqlite_backend(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "ratelimit.sqlite3")
+            self.assert_runs_out_after(SQLiteBackend(path), 3)
+
+            # Another process opening the same file sees the same buckets
+            self.assertGreater(SQLiteBackend(path).consume("key", 3, 0.001), 0)
+
+
+@override_settings(
+    RATELIMIT_ENABLED=True,
+    RATELIMIT_BACKEND="lists.ratelimit.MemoryBackend",
+    RATELIMIT_RATES={
+        "new_list": (2, 0.01),
+        "new_item": (1, 0.01),
+        "add_items": (3, 0.01),
+    },
+)
+@single_shard
+class RateLimitedViewsTest(TestCase):
+    """
+    Tests if the views refuse clients that went over their rate
+    """
+
+    def setUp(self):
+        # Every test starts with full buckets
+        reset_backend(setting="RATELIMIT_BACKEND")
+
+    def test_new_list_returns_429_when_over_the_limit(self):
+        self.client.post("/lists/new", data={"text": "one"})
+        self.client.post("/lists/new", data={"text": "two"})
+        response = self.client.post("/lists/new", data={"text": "three"})
+
+        # Did we refuse the third list?
+        self.assertEqual(response.status_code, 429)
+        # Are we telling the client when to come back?
+        self.assertEqual(response["Retry-After"], "100")
+        self.assertEqual(List.objects.count(), 2)
+
+    def test_adding_items_is_limited(self):
+        list_ = List.objects.create()
+        self.client.post(f"/lists/{list_.public_id}/", data={"text": "one"})
+        response = self.client.post(f"/lists/{list_.public_id}/", data={"text": "two"})
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(Item.objects.count(), 1)
+
+    def test_batches_of_items_take_a_token_per_item(self):
+        list_ = List.objects.create()
+        url = f"/lists/{list_.public_id}/items"
+
+        def post_items(*items):
+            return self.client.post(
+                url, data=json.dumps({"items": items}), content_type="application/json"
+            )
+
+        # The batch took every token of the bucket
+        self.assertEqual(post_items("one", "two", "three").status_code, 201)
+        response = post_items("four")
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "100")
+        self.assertEqual(Item.objects.count(), 3)
+
+    def test_batches_bigger_than_the_budget_are_refused(self):
+        list_ = List.objects.create()
+        response = self.client.post(
+            f"/lists/{list_.public_id}/items",
+            data=json.dumps({"items": ["one", "two", "three", "four"]}),
+            content_type="application/json",
+        )
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(Item.objects.count(), 0)
+
+    def test_reading_lists_is_not_limited(self):
+        list_ = List.objects.create()
+        for _ in range(3):
+            response = self.client.get(f"/lists/{list_.public_id}/")
+            self.assertEqual(response.status_code, 200)
+
+    def test_clients_have_separate_buckets(self):
+        list_ = List.objects.create()
+        self.client.post(f"/lists/{list_.public_id}/", data={"text": "one"})
+        response = self.client.post(
+            f"/lists/{list_.public_id}/", data={"text": "two"}, REMOTE_ADDR="10.0.0.2"
+        )
+        self.assertEqual(response.status_code, 302)
+
+    @override_settings(RATELIMIT_IP_HEADER="HTTP_X_REAL_IP")
+    def test_client_ip_can_come_from_the_proxy(self):
+        list_ = List.objects.create()
+        self.client.post(f"/lists/{list_.public_id}/", data={"text": "one"})
+        # Same REMOTE_ADDR, the proxy socket, but another client
+        response = self.client.post(
+            f"/lists/{list_.public_id}/",
+            data={"text": "two"},
+            HTTP_X_REAL_IP="10.0.0.2",
+        )
+        self.assertEqual(response.status_code, 302)
+
+
+@override_settings(RATELIMIT_ENABLED=True, RATELIMIT_RATES={"new_list": (1, 0.01)})
+@single_shard
+class DeployedRateLimitTest(TestCase):
+    """
+    Tests the rate limits with the settings of the web workers
+    """
+
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        deployed = override_settings(
+            RATELIMIT_BACKEND=settings_slim.RATELIMIT_BACKEND,
+            RATELIMIT_OPTIONS={"path": os.path.join(folder.name, "ratelimit.sqlite3")},
+            RATELIMIT_IP_HEADER=settings_slim.RATELIMIT_IP_HEADER,
+        )
+        deployed.enable()
+        self.addCleanup(deployed.disable)
+
+    def post_list(self, real_ip):
+        # Requests come from nginx through a unix socket
+        return self.client.post(
+            "/lists/new", data={"text": "one"}, REMOTE_ADDR="", HTTP_X_REAL_IP=real_ip
+        )
+
+    def test_clients_behind_nginx_have_separate_buckets(self):
+        self.assertEqual(self.post_list("10.0.0.1").status_code, 302)
+        self.assertEqual(self.post_list("10.0.0.2").status_code, 302)
+        self.assertEqual(self.post_list("10.0.0.1").status_code, 429)
@@ -0,0 +1,198 @@
+"""
+Unit tests for the sharding of lists
+"""
+from io import StringIO
+from unittest import skipUnless
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from lists.archive import archive_list
+from lists.models import ArchivedList, Item, ItemBatch, List, ListIdBlock
+from lists.public_ids import new_public_id
+from lists.routers import ListShardRouter
+from lists.sharding import (
+    ListIdAllocator,
+    is_sharded,
+    jump_hash,
+    shard_for_list,
+)
+from lists.tests.factories import SHARD_DATABASES, EveryShardTestCase
+
+
+class JumpHashTest(TestCase):
+    """
+    Tests for the consistent hash that picks the shards
+    """
+
+    def test_keys_land_in_every_bucket(self):
+        buckets = {jump_hash(key, 4) for key in range(1000)}
+        self.assertEqual(buckets, {0, 1, 2, 3})
+
+    def test_adding_a_bucket_only_moves_keys_into_it(self):
+        for key in range(1000):
+            before, after = jump_hash(key, 3), jump_hash(key, 4)
+            # Did the key stay, or move to the new bucket?
+            self.assertIn(after, (before, 3))
+
+    @override_settings(LIST_SHARDS=["default", "shard1", "shard2"])
+    def test_public_ids_are_spread_over_the_shards(self):
+        shards = {shard_for_list(new_public_id()) for _ in range(100)}
+        self.assertEqual(shards, {"default", "shard1", "shard2"})
+
+
+@override_settings(LIST_ID_BLOCK_SIZE=3)
+class ListIdAllocatorTest(EveryShardTestCase):
+    """
+    Tests for the block allocation of list ids
+    """
+
+    def test_ids_are_unique_across_allocators(self):
+        first, second = ListIdAllocator(), ListIdAllocator()
+        ids = [allocator.allocate() for allocator in (first, second) * 4]
+        self.assertEqual(len(set(ids)), 8)
+
+    def test_blocks_start_after_existing_lists(self):
+        ListIdBlock.objects.all().delete()
+        List.objects.create(id=50)
+
+        self.assertEqual(ListIdAllocator().allocate(), 51)
+
+    def test_only_one_query_per_block(self):
+        allocator = ListIdAllocator()
+        allocator.allocate()
+        with self.assertNumQueries(0):
+            allocator.allocate()
+            allocator.allocate()
+
+
+@override_settings(LIST_SHARDS=["default", "shard1"])
+class ListShardRouterTest(TestCase):
+    """
+    Tests for the decisions of the shard router
+    """
+
+    def setUp(self):
+        self.router = ListShardRouter()
+
+    def test_new_lists_go_to_their_shard(self):
+        list_ = List()
+        self.assertEqual(
+            self.router.db_for_write(List, instance=list_),
+            shard_for_list(list_.public_id),
+        )
+
+    def test_items_follow_their_list(self):
+        list_ = List()
+        list_._state.db = "shard1"
+        item = Item(list=list_)
+        self.assertEqual(self.router.db_for_write(Item, instance=item), "shard1")
+
+    def public_id_in(self, shard):
+        while True:
+            public_id = new_public_id()
+            if shard_for_list(public_id) == shard:
+                return public_id
+
+    def test_public_id_hint(self):
+        public_id = self.public_id_in("shard1")
+        self.assertEqual(self.router.db_for_read(List, public_id=public_id), "shard1")
+
+    def test_reads_of_the_default_shard_are_left_to_the_replica_router(self):
+        public_id = self.public_id_in("default")
+        self.assertIsNone(self.router.db_for_read(List, public_id=public_id))
+        self.assertEqual(self.router.db_for_write(List, public_id=public_id), "default")
+
+    @override_settings(DATABASE_REPLICAS=["replica1"])
+    def test_replicas_relate_to_the_default_shard(self):
+        list_, item = List(), Item()
+        list_._state.db, item._state.db = "replica1", "default"
+        self.assertTrue(self.router.allow_relation(item, list_))
+        item._state.db = "shard1"
+        self.assertFalse(self.router.allow_relation(item, list_))
+
+    def test_queries_without_a_list_are_left_to_the_next_router(self):
+        self.assertIsNone(self.router.db_for_read(List))
+
+    def test_other_shards_only_get_the_sharded_tables(self):
+        self.assertTrue(self.router.allow_migrate("shard1", "lists", "item"))
+        self.assertFalse(self.router.allow_migrate("shard1", "lists", "listidblock"))
+        self.assertFalse(self.router.allow_migrate("shard1", "sessions", "session"))
+        self.assertIsNone(self.router.allow_migrate("default", "sessions", "session"))
+
+    @override_settings(LIST_SHARDS=["default"])
+    def test_single_shard_does_not_route(self):
+        self.assertIsNone(self.router.db_for_write(List, instance=List()))
+
+
+@skipUnless(is_sharded(), "Set SUPERLISTS_SHARD_DBS to run")
+class ShardedListsTest(TestCase):
+    """
+    Tests the sharding against real databases. Run them with
+
+        SUPERLISTS_SHARD_DBS=/tmp/shard1.sqlite3,/tmp/shard2.sqlite3 \\
+            python manage.py test lists.tests.test_sharding
+    """
+
+    databases = SHARD_DATABASES
+
+    def make_lists(self, count):
+        lists = []
+        for number in range(count):
+            list_ = List.objects.create()
+            Item.objects.create(list=list_, text=f"item {number}")
+            lists.append(list_)
+        return lists
+
+    def test_lists_and_items_are_stored_in_their_shard(self):
+        for list_ in self.make_lists(10):
+            shard = shard_for_list(list_.public_id)
+            self.assertEqual(List.objects.using(shard).filter(id=list_.id).count(), 1)
+            self.assertEqual(Item.objects.using(shard).filter(list=list_).count(), 1)
+
+    def test_views_find_lists_in_any_shard(self):
+        for list_ in self.make_lists(5):
+            self.client.post(f"/lists/{list_.public_id}/", data={"text": "second"})
+            response = self.client.get(f"/lists/{list_.public_id}/")
+            self.assertContains(response, "2: second")
+
+    def test_archival_happens_in_the_shard(self):
+        list_ = self.make_lists(1)[0]
+        archive_list(list_.id, shard_for_list(list_.public_id))
+        shard = shard_for_list(list_.public_id)
+        self.assertEqual(ArchivedList.objects.using(shard).count(), 1)
+
+    def test_rebalance_moves_lists_into_their_shard(self):
+        # Lists created before the other shards existed
+        with override_settings(LIST_SHARDS=["default"]):
+            lists = self.make_lists(10)
+            archive_list(lists[0].id, "default")
+            ItemBatch.objects.create(list=lists[1], batch_id="sent")
+
+        output = StringIO()
+        call_command("rebalance_shards", batch_size=3, stdout=output)
+
+        for list_ in lists:
+            shard = shard_for_list(list_.public_id)
+            self.assertTrue(List.objects.using(shard).filter(id=list_.id).exists())
+            for other in settings.LIST_SHARDS:
+                if other != shard:
+                    self.assertFalse(
+                        List.objects.using(other).filter(id=list_.id).exists()
+                    )
+        # The archive moved along with its list
+        shard = shard_for_list(lists[0].public_id)
+        self.assertTrue(
+            ArchivedList.objects.using(shard).filter(list=lists[0]).exists()
+        )
+        # So did the ids of the batches sent to the list
+        shard = shard_for_list(lists[1].public_id)
+        self.assertTrue(
+            ItemBatch.objects.using(shard)
+            .filter(list=lists[1], batch_id="sent")
+            .exists()
+        )
+        # Running it again has nothing left to do
+        call_command("rebalance_shards", stdout=output)
+        self.assertIn("0 lists moved", output.getvalue().splitlines()[-1])
@@ -1,22 +1,29 @@
 """
 Unit tests for our views
 """
+import json
 import re
 
+from django.conf import settings
+from django.db import connection
 from django.http import HttpRequest
 from django.shortcuts import render
-from django.test import TestCase
-from django.urls import resolve
-from django.utils.html import escape
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils.html import escape, escapejs
 
+from lists.archive import archive_list
 from lists.forms import EMPTY_ITEM_ERROR, ItemForm
 from lists.models import Item, List
-from lists.views import home_page
+from lists.public_ids import new_public_id
+from lists.tests.factories import make_list, single_shard
+from lists.views import OFFLINE_PAGES, home_page
 
 
 def remove_csrf_token(response):
     """
-    remove_csrf_token removes the contents of a CSRF token present in a 
+    remove_csrf_token removes the contents of a CSRF token present in a
     rendered template.
 
     Those tokens change everytime the page is rendered, so they must be
@@ -65,6 +72,7 @@ class HomePageTest(TestCase):
         self.assertIsInstance(response.context["form"], ItemForm)
 
 
+@single_shard
 class NewListTest(TestCase):
     """
     NewListTest provides tests for creating a new list
@@ -88,7 +96,7 @@ class NewListTest(TestCase):
 
         new_list = List.objects.first()
         self.assertEqual(response.status_code, 302)
-        self.assertRedirects(response, f"/lists/{new_list.id}/")
+        self.assertRedirects(response, f"/lists/{new_list.public_id}/")
 
     def test_for_invalid_input_renders_home_template(self):
         response = self.client.post("/lists/new", data={"text": ""})
@@ -109,15 +117,22 @@ class NewListTest(TestCase):
         self.assertEqual(Item.objects.count(), 0)
 
 
+@single_shard
 class ListViewTest(TestCase):
     """
     ListViewTest tests if the rendering and displaying of a created list
     works correctly
     """
 
+    @classmethod
+    def setUpTestData(cls):
+        # Each test runs in a transaction that is rolled back, so these lists
+        # are created once for the whole class
+        cls.list_ = make_list()
+        cls.other_list = make_list()
+
     def post_invalid_input(self):
-        list_ = List.objects.create()
-        return self.client.post(f"/lists/{list_.id}/", data={"text": ""})
+        return self.client.post(f"/lists/{self.list_.public_id}/", data={"text": ""})
 
     def test_for_invalid_input_nothing_saved_to_db(self):
         self.post_invalid_input()
@@ -140,23 +155,17 @@ class ListViewTest(TestCase):
         """
         Is the list rendered with the correct template?
         """
-        list_ = List.objects.create()
-        response = self.client.get(f"/lists/{list_.id}/")
+        response = self.client.get(f"/lists/{self.list_.public_id}/")
         self.assertTemplateUsed(response, "list.html")
 
     def test_displays_only_items_for_that_list(self):
         """
         Do we display just the correct list items?
         """
-        first_list = List.objects.create()
-        Item.objects.create(text="item1", list=first_list)
-        Item.objects.create(text="item2", list=first_list)
-
-        second_list = List.objects.create()
-        Item.objects.create(text="other list item 1", list=second_list)
-        Item.objects.create(text="other list item 2", list=second_list)
+        first_list = make_list("item1", "item2")
+        make_list("other list item 1", "other list item 2")
 
-        response = self.client.get(f"/lists/{first_list.id}/")
+        response = self.client.get(f"/lists/{first_list.public_id}/")
 
         self.assertContains(response, "item1")
         self.assertContains(response, "item2")
@@ -167,12 +176,10 @@ class ListViewTest(TestCase):
         """
         If we have more than one list, are we still rendering the right one?
         """
-        # Creating a dummy, empty list
-        other_list = List.objects.create()  # pylint: disable=unused-variable
-        # Creating the list we want
-        correct_list = List.objects.create()
+        # Besides a dummy, empty list, self.other_list, we have the list we want
+        correct_list = self.list_
         # Loading the list we want
-        response = self.client.get(f"/lists/{correct_list.id}/")
+        response = self.client.get(f"/lists/{correct_list.public_id}/")
 
         # Checking if the correct list was sent in the context
         self.assertEqual(response.context["list"], correct_list)
@@ -183,16 +190,16 @@ class ListViewTest(TestCase):
         and save it. This test was written by me without checking
         the book's solution.
         """
-        # Creates a new list
-        list_ = List.objects.create()
+        # Uses an empty list
+        list_ = self.list_
         # Adds an item to that list
         first_item = Item.objects.create(text="Hai", list=list_)
         # Data regarding a new item we want to add
         new_item = {"text": "new item!"}
         # Posts the item
-        self.client.post(f"/lists/{list_.id}/", data=new_item)
+        self.client.post(f"/lists/{list_.public_id}/", data=new_item)
         # Reading the list
-        response = self.client.get(f"/lists/{list_.id}/")
+        response = self.client.get(f"/lists/{list_.public_id}/")
 
         # This assertion looks more like an functional test than an unit one
         # Notice how in the book's test below, the author did not check
@@ -205,12 +212,13 @@ class ListViewTest(TestCase):
         """
         This is the same test as the above, but as written in the book
         """
-        # Creates two lists, to check if we're saving the data in the right one
-        other_list = List.objects.create()
-        correct_list = List.objects.create()
+        # Uses two lists, to check if we're saving the data in the right one
+        other_list, correct_list = self.other_list, self.list_
 
         # Posts a new item to the correct list
-        self.client.post(f"/lists/{correct_list.id}/", data={"text": "A new item!"})
+        self.client.post(
+            f"/lists/{correct_list.public_id}/", data={"text": "A new item!"}
+        )
 
         # Do we have only _one_ item in the database?
         self.assertEqual(Item.objects.count(), 1)
@@ -227,26 +235,26 @@ class ListViewTest(TestCase):
         """
         Tests if the correct redirection is being used
         """
-        # Again, two lists. One we don't want to change and another one we do
-        other_list = List.objects.create()  # pylint: disable=unused-variable
-        correct_list = List.objects.create()
+        # Again, two lists. One we don't want to change, self.other_list, and
+        # another one we do
+        correct_list = self.list_
 
         # Creating a new item in the list we do want to change
         response = self.client.post(
-            f"/lists/{correct_list.id}/", data={"text": "Another item!"}
+            f"/lists/{correct_list.public_id}/", data={"text": "Another item!"}
         )
 
         # Are we going to be redirect to the correct list?
-        self.assertRedirects(response, f"/lists/{correct_list.id}/")
+        self.assertRedirects(response, f"/lists/{correct_list.public_id}/")
 
     def test_validation_errors_end_up_on_lists_page(self):
         """
         Checks if validation errors are exposed by the view
         """
-        # Create a new list
-        list_ = List.objects.create()
-        # Adds an invalid item
-        response = self.client.post(f"/lists/{list_.id}/", data={"text": ""})
+        # Adds an invalid item to an empty list
+        response = self.client.post(
+            f"/lists/{self.list_.public_id}/", data={"text": ""}
+        )
 
         # Did we have an HTTP-200?
         self.assertEqual(response.status_code, 200)
@@ -258,8 +266,232 @@ class ListViewTest(TestCase):
         self.assertContains(response, expected_error)
 
     def test_displays_item_form(self):
-        list_ = List.objects.create()
-        response = self.client.get(f"/lists/{list_.id}/")
+        response = self.client.get(f"/lists/{self.list_.public_id}/")
         self.assertIsInstance(response.context["form"], ItemForm)
         self.assertContains(response, 'name="text"')
 
+    def test_legacy_integer_urls_redirect_to_the_public_id(self):
+        """
+        Do the old /lists/<id>/ URLs still lead to the list?
+        """
+        response = self.client.get(f"/lists/{self.list_.id}/")
+        self.assertRedirects(
+            response, f"/lists/{self.list_.public_id}/", status_code=301
+        )
+
+    def test_unknown_lists_are_not_found(self):
+        response = self.client.get("/lists/0000000000000000000000/")
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get("/lists/12345/")
+        self.assertEqual(response.status_code, 404)
+
+    def test_showing_a_list_takes_three_queries(self):
+        with self.assertNumQueries(3):
+            # One for the list, one for its ETag and one for its items
+            self.client.get(f"/lists/{self.list_.public_id}/")
+
+    def test_pages_can_be_kept_by_shared_caches(self):
+        response = self.client.get(f"/lists/{self.list_.public_id}/")
+
+        self.assertIn("public", response["Cache-Control"])
+        self.assertTrue(response.has_header("ETag"))
+        self.assertNotIn("Cookie", response.get("Vary", ""))
+        self.assertEqual(response.cookies, {})
+
+    def test_unchanged_lists_are_not_sent_again(self):
+        url = f"/lists/{self.list_.public_id}/"
+        etag = self.client.get(url)["ETag"]
+
+        with self.assertNumQueries(2):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+        Item.objects.create(text="new item", list=self.list_)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_new_releases_send_the_lists_again(self):
+        url = f"/lists/{self.list_.public_id}/"
+        etag = self.client.get(url)["ETag"]
+
+        with override_settings(RELEASE="next"):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+@single_shard
+class AddItemsTest(TestCase):
+    """
+    Tests for the batches of items sent by the offline client
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.list_ = make_list("first")
+        cls.url = f"/lists/{cls.list_.public_id}/items"
+
+    def post_items(self, items, **kwargs):
+        return self.client.post(
+            self.url,
+            data=json.dumps({"items": items}),
+            content_type="application/json",
+            **kwargs,
+        )
+
+    def texts(self):
+        return list(self.list_.item_set.order_by("id").values_list("text", flat=True))
+
+    def test_adds_the_items_in_order(self):
+        response = self.post_items(["second", "third", "fourth"])
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json(), {"added": 3})
+        self.assertEqual(self.texts(), ["first", "second", "third", "fourth"])
+
+    def test_adds_the_batch_with_a_single_insert(self):
+        with CaptureQueriesContext(connection) as context:
+            self.post_items([f"item {number}" for number in range(20)])
+
+        inserts = [q for q in context if q["sql"].startswith("INSERT")]
+        self.assertEqual(len(inserts), 1)
+
+    def test_batches_sent_again_are_added_once(self):
+        batch = {"id": "3f0c1b9e-batch", "items": ["second"]}
+        for _ in range(2):
+            response = self.client.post(
+                self.url, data=json.dumps(batch), content_type="application/json"
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"added": 0})
+        self.assertEqual(self.texts(), ["first", "second"])
+
+    def test_batch_ids_are_per_list(self):
+        other_list = make_list()
+        batch = json.dumps({"id": "same-id", "items": ["again"]})
+        for list_ in (self.list_, other_list):
+            self.client.post(
+                f"/lists/{list_.public_id}/items",
+                data=batch,
+                content_type="application/json",
+            )
+        self.assertEqual(Item.objects.filter(text="again").count(), 2)
+
+    def test_batches_with_an_invalid_item_are_turned_down(self):
+        response = self.post_items(["fine", ""])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"errors": {"1": [EMPTY_ITEM_ERROR]}})
+        self.assertEqual(self.texts(), ["first"])
+
+    def test_malformed_batches_are_turned_down(self):
+        for body in [
+            "not json",
+            "[]",
+            '{"items": "text"}',
+            '{"items": []}',
+            '{"id": 7, "items": ["item"]}',
+            '{"id": "%s", "items": ["item"]}' % ("x" * 37),
+        ]:
+            response = self.client.post(
+                self.url, data=body, content_type="application/json"
+            )
+            self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.texts(), ["first"])
+
+    @override_settings(LIST_SYNC_MAX_ITEMS=2)
+    def test_batches_are_capped(self):
+        response = self.post_items(["one", "two", "three"])
+        self.assertEqual(response.status_code, 400)
+
+    def test_only_takes_posts_to_known_lists(self):
+        self.assertEqual(self.client.get(self.url).status_code, 405)
+        response = self.client.post(
+            "/lists/0000000000000000000000/items",
+            data=json.dumps({"items": ["lost"]}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_restores_archived_lists_first(self):
+        archive_list(self.list_.id, "default")
+
+        self.post_items(["second"])
+
+        self.list_.refresh_from_db()
+        self.assertFalse(self.list_.archived)
+        self.assertEqual(self.texts(), ["first", "second"])
+
+    def test_takes_the_csrf_token_from_a_header(self):
+        self.client = Client(enforce_csrf_checks=True)
+        self.assertEqual(self.post_items(["second"]).status_code, 403)
+
+        token = self.client.get("/lists/csrf").json()["token"]
+        response = self.post_items(["second"], HTTP_X_CSRFTOKEN=token)
+
+        self.assertEqual(response.status_code, 201)
+
+    def test_list_pages_point_the_client_at_it(self):
+        response = self.client.get(f"/lists/{self.list_.public_id}/")
+        self.assertContains(response, f'data-items-url="{self.url}"')
+
+
+class ServiceWorkerTest(TestCase):
+    """
+    Tests for the service worker of the offline client
+    """
+
+    def test_is_served_from_the_root(self):
+        response = self.client.get("/sw.js")
+
+        self.assertEqual(response["Content-Type"], "application/javascript")
+        self.assertEqual(response["Cache-Control"], "no-cache")
+        self.assertContains(response, 'var STATIC_URL = "/static/";')
+
+    def test_only_keeps_the_home_page_and_the_lists(self):
+        response = self.client.get("/sw.js")
+        self.assertContains(response, escapejs(OFFLINE_PAGES))
+
+        list_url = reverse("view_list", args=[new_public_id()])
+        for path in ["/", list_url]:
+            self.assertTrue(re.match(OFFLINE_PAGES, path), path)
+        for path in ["/lists/mine", "/admin/", "/lists/new", f"{list_url}items"]:
+            self.assertFalse(re.match(OFFLINE_PAGES, path), path)
+
+
+@single_shard
+class CsrfTokenTest(TestCase):
+    """
+    Tests for the CSRF tokens, which the pages fetch from /lists/csrf
+    """
+
+    def setUp(self):
+        self.client = Client(enforce_csrf_checks=True)
+
+    def test_hands_out_a_token_with_its_cookie(self):
+        response = self.client.get("/lists/csrf")
+
+        self.assertTrue(response.json()["token"])
+        self.assertIn(settings.CSRF_COOKIE_NAME, response.cookies)
+        self.assertIn("no-cache", response["Cache-Control"])
+
+    def test_pages_dont_carry_tokens(self):
+        response = self.client.get("/")
+        self.assertContains(response, 'name="csrfmiddlewaretoken" value=""')
+        self.assertNotIn(settings.CSRF_COOKIE_NAME, response.cookies)
+
+    def test_posts_with_the_token_are_accepted(self):
+        token = self.client.get("/lists/csrf").json()["token"]
+
+        response = self.client.post(
+            "/lists/new", data={"text": "item", "csrfmiddlewaretoken": token}
+        )
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Item.objects.count(), 1)
+
+    def test_posts_without_the_token_are_rejected(self):
+        response = self.client.post("/lists/new", data={"text": "item"})
+        self.assertEqual(response.status_code, 403)
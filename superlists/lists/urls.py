@@ -13,11 +13,18 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from django.urls import path
+from django.urls import path, register_converter
 
 from . import views as ListViews
+from .public_ids import PublicIdConverter
+
+register_converter(PublicIdConverter, "public_id")
 
 urlpatterns = [
-    path("<int:list_id>/", ListViews.view_list, name="view_list"),
+    path("<public_id:public_id>/", ListViews.view_list, name="view_list"),
+    path("<public_id:public_id>/items", ListViews.add_items, name="add_items"),
+    path("<int:list_id>/", ListViews.legacy_list_redirect, name="legacy_list"),
     path("new", ListViews.new_list, name="new_list"),
+    path("csrf", ListViews.csrf_token, name="csrf_token"),
+    path("mine", ListViews.my_lists, name="my_lists"),
 ]
@@ -1,11 +1,33 @@
 """
 Module that supplies all the views for the Lists app
 """
+import json
+
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
 from django.core.exceptions import ValidationError
-from django.shortcuts import redirect, render
+from django.db import transaction
+from django.db.models import Count, Max
+from django.http import Http404, HttpResponseBadRequest, JsonResponse
+from django.middleware.csrf import get_token
+from django.shortcuts import get_object_or_404, redirect, render
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_POST
 
+from lists.access import record_access
 from lists.forms import ItemForm
-from lists.models import Item, List
+from lists.models import ArchivedList, Item, ItemBatch, List
+from lists.owners import count_lists, forget_count, owner_lists
+from lists.public_ids import PublicIdConverter
+from lists.ratelimit import check_rate, ratelimit, too_many_requests
+from lists.sharding import shard_for_list
+
+
+# The pages the service worker keeps for offline use, the home page and the
+# lists. Others may belong to a user, so they're never kept.
+OFFLINE_PAGES = rf"^/(lists/{PublicIdConverter.regex}/)?$"
 
 
 def home_page(request):
@@ -15,24 +37,62 @@ def home_page(request):
     return render(request, "home.html", {"form": ItemForm()})
 
 
+@ratelimit("new_list")
 def new_list(request):
     """
     Creates a new list
     """
     form = ItemForm(data=request.POST)
     if form.is_valid():
-        list_ = List.objects.create()
+        owner_id = request.user.id if request.user.is_authenticated else None
+        list_ = List.objects.create(owner_id=owner_id)
         form.save(for_list=list_)
+        if owner_id is not None:
+            forget_count(owner_id)
         return redirect(list_)
 
     return render(request, "home.html", {"form": form})
 
 
-def view_list(request, list_id):
+def list_etag(list_):
+    """
+    Returns an ETag that changes whenever an item of `list_` is added or
+    removed, and with every release, whose pages may look different
+    """
+    items = list_.item_set.aggregate(last=Max("id"), count=Count("id"))
+    return quote_etag(
+        f"{settings.RELEASE}-{list_.public_id}-{items['last'] or 0}-{items['count']}"
+    )
+
+
+def cacheable(response, etag):
+    """
+    Lets shared caches keep `response`, and check back once it's stale
+    """
+    response["ETag"] = etag
+    patch_cache_control(response, public=True, max_age=settings.LIST_CACHE_MAX_AGE)
+    return response
+
+
+@ratelimit("new_item")
+def view_list(request, public_id):
     """
     Renders an specific list with all its items
     """
-    list_ = List.objects.get(id=list_id)
+    list_ = get_object_or_404(List.objects.in_shard_of(public_id), public_id=public_id)
+    if list_.archived and request.method == "POST":
+        # Few lists are archived, so workers only import this when they meet one
+        from lists.archive import restore_list
+
+        # New items go after the archived ones
+        restore_list(list_)
+    record_access(list_)
+    etag = None
+    if request.method in ("GET", "HEAD") and not list_.archived:
+        etag = list_etag(list_)
+        response = get_conditional_response(request, etag=etag)
+        if response is not None:
+            return cacheable(response, etag)
     form = ItemForm()
 
     if request.method == "POST":
@@ -41,4 +101,151 @@ def view_list(request, list_id):
             form.save(for_list=list_)
             return redirect(list_)
 
-    return render(request, "list.html", {"list": list_, "form": form})
+    if list_.archived:
+        from lists import tasks
+        from lists.archive import unpack_items
+
+        try:
+            blob = list_.archive.items
+        except ArchivedList.DoesNotExist:
+            # Restored since the list was read
+            items = list_.item_set.all()
+        else:
+            # Reading the archive is enough to show the list, so the restore
+            # can wait for a worker. Every visit until then asks for it again
+            tasks.restore_list.enqueue_once(list_.public_id)
+            items = [Item(text=text) for text in unpack_items(blob)]
+    else:
+        items = list_.item_set.all()
+    context = {
+        "list": list_,
+        "items": items,
+        "form": form,
+        "batch_size": settings.LIST_SYNC_MAX_ITEMS,
+    }
+    response = render(request, "list.html", context)
+    if etag is not None:
+        cacheable(response, etag)
+    return response
+
+
+@require_POST
+def add_items(request, public_id):
+    """
+    Adds a batch of items to a list, in the order they were sent. The
+    offline client queues the items typed into a list page and sends them
+    here as {"id": "<batch id>", "items": ["first", "second", ...]}. A batch
+    whose id was already added is acknowledged without adding it again.
+    """
+    list_ = get_object_or_404(List.objects.in_shard_of(public_id), public_id=public_id)
+    try:
+        data = json.loads(request.body)
+        texts = data["items"]
+        batch_id = data.get("id")
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return JsonResponse({"error": 'Expected {"items": [...]}'}, status=400)
+    if not isinstance(texts, list) or not texts:
+        return JsonResponse({"error": "Expected a list of items"}, status=400)
+    if batch_id is not None and not (
+        isinstance(batch_id, str) and 0 < len(batch_id) <= 36
+    ):
+        return JsonResponse(
+            {"error": "Expected a batch id of 36 characters at most"}, status=400
+        )
+    if len(texts) > settings.LIST_SYNC_MAX_ITEMS:
+        return JsonResponse(
+            {"error": f"At most {settings.LIST_SYNC_MAX_ITEMS} items at a time"},
+            status=400,
+        )
+    if settings.RATELIMIT_ENABLED:
+        # A token per item, so batches don't get around the limit
+        retry_after = check_rate(request, "add_items", cost=len(texts))
+        if retry_after:
+            return too_many_requests(retry_after)
+
+    forms = [ItemForm(data={"text": text}) for text in texts]
+    errors = {
+        index: list(form.errors["text"])
+        for index, form in enumerate(forms)
+        if not form.is_valid()
+    }
+    if errors:
+        # Nothing is saved, so the client can send the batch again once fixed
+        return JsonResponse({"errors": errors}, status=400)
+
+    if list_.archived:
+        from lists.archive import restore_list
+
+        restore_list(list_)
+    record_access(list_)
+    with transaction.atomic(using=shard_for_list(public_id)):
+        if batch_id is not None:
+            # Sent again because the client missed the response, or by
+            # another tab
+            _, created = ItemBatch.objects.in_shard_of(public_id).get_or_create(
+                list=list_, batch_id=batch_id
+            )
+            if not created:
+                return JsonResponse({"added": 0})
+        # A single INSERT, which numbers the items in the order they came in
+        items = Item.objects.in_shard_of(public_id).bulk_create(
+            Item(list=list_, text=form.cleaned_data["text"]) for form in forms
+        )
+    list_.mark_updated()
+    return JsonResponse({"added": len(items)}, status=201)
+
+
+def service_worker(request):
+    """
+    Serves the service worker of the offline client. It's served from the
+    root, since a service worker only controls the pages under its own URL.
+    """
+    context = {"offline_pages": OFFLINE_PAGES}
+    response = render(request, "sw.js", context, content_type="application/javascript")
+    # Browsers check for a new worker on every visit
+    response["Cache-Control"] = "no-cache"
+    return response
+
+
+@never_cache
+def csrf_token(request):
+    """
+    Hands the CSRF token to the script of the pages, which leave it out so
+    shared caches can keep them
+    """
+    return JsonResponse({"token": get_token(request)})
+
+
+@login_required
+def my_lists(request):
+    """
+    Renders a page of the lists of the user, most recently updated first
+    """
+    try:
+        lists, next_cursor = owner_lists(request.user.id, request.GET.get("before"))
+    except (ValueError, OverflowError):
+        return HttpResponseBadRequest("Invalid page")
+    context = {
+        "lists": lists,
+        "next_cursor": next_cursor,
+        "count": count_lists(request.user.id),
+        "form": ItemForm(),
+    }
+    return render(request, "my_lists.html", context)
+
+
+def legacy_list_redirect(request, list_id):  # pylint: disable=unused-argument
+    """
+    Redirects the old integer list URLs to the public id ones
+    """
+    # Old URLs don't say which shard the list is in, so we ask each of them
+    for alias in settings.LIST_SHARDS:
+        public_id = (
+            List.objects.using(alias)
+            .filter(id=list_id)
+            .values_list("public_id", flat=True)
+            .first()
+        )
+        if public_id is not None:
+            return redirect("view_list", public_id, permanent=True)
+    raise Http404("No list found")
@@ -0,0 +1,67 @@
+"""
+Session, authentication and messages middleware that leave anonymous reads
+alone.
+
+Visitors of the lists never log in, so their reads have no session to load,
+no user to look up and no messages to show. Going through the session still
+costs a lookup and marks the response with `Vary: Cookie`, which keeps shared
+caches from storing the page. These middleware only run for requests that
+write, or that come with a session cookie, like the ones of the admin.
+"""
+from django.conf import settings
+from django.contrib.auth import middleware as auth
+from django.contrib.messages import middleware as messages
+from django.contrib.sessions import middleware as sessions
+
+from superlists.middleware import SAFE_METHODS
+
+
+def is_anonymous_read(request):
+    """
+    Is `request` a read by a visitor without a session?
+    """
+    return (
+        request.method in SAFE_METHODS
+        and settings.SESSION_COOKIE_NAME not in request.COOKIES
+    )
+
+
+class AnonymousReadsMixin:
+    """
+    Skips the middleware it's mixed into for anonymous reads
+    """
+
+    def __call__(self, request):
+        if is_anonymous_read(request):
+            self.skip(request)
+            return self.get_response(request)
+        return super().__call__(request)
+
+    def skip(self, request):
+        """
+        Sets up `request` the way the skipped middleware would have
+        """
+
+
+class SessionMiddleware(AnonymousReadsMixin, sessions.SessionMiddleware):
+    """
+    SessionMiddleware that doesn't load sessions for anonymous reads
+    """
+
+
+class AuthenticationMiddleware(AnonymousReadsMixin, auth.AuthenticationMiddleware):
+    """
+    AuthenticationMiddleware that doesn't look users up for anonymous reads
+    """
+
+    def skip(self, request):
+        # Importing the models with the module fails without the auth app
+        from django.contrib.auth.models import AnonymousUser
+
+        request.user = AnonymousUser()
+
+
+class MessageMiddleware(AnonymousReadsMixin, messages.MessageMiddleware):
+    """
+    MessageMiddleware that doesn't read messages for anonymous reads
+    """
@@ -0,0 +1,124 @@
+"""
+Middleware for the whole project
+"""
+import re
+from gzip import GzipFile
+from io import BytesIO
+
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+
+from superlists.routers import pin_to_primary
+
+PIN_COOKIE = "pin_primary"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS", "TRACE")
+
+
+class ReplicaPinningMiddleware:
+    """
+    Pins the reads of a request to the primary database when the request
+    writes, and for `REPLICA_PIN_SECONDS` after it.
+
+    That way the GET that follows the `redirect(list_)` of a POST sees the
+    item that was just added, even if the replicas are lagging behind.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        writes = request.method not in SAFE_METHODS
+        pin_to_primary(writes or PIN_COOKIE in request.COOKIES)
+        try:
+            response = self.get_response(request)
+        finally:
+            pin_to_primary(False)
+
+        if writes and settings.DATABASE_REPLICAS:
+            response.set_cookie(
+                PIN_COOKIE, "1", max_age=settings.REPLICA_PIN_SECONDS, httponly=True
+            )
+        return response
+
+
+def gzip_bytes(data, level):
+    """
+    Compresses `data` with gzip at `level`
+    """
+    buffer = BytesIO()
+    with GzipFile(mode="wb", compresslevel=level, fileobj=buffer, mtime=0) as zfile:
+        zfile.write(data)
+    return buffer.getvalue()
+
+
+def gzip_stream(chunks, level):
+    """
+    Compresses an iterator of byte strings. Every chunk is flushed as soon
+    as it's compressed, so a slow stream reaches the client as it goes.
+    """
+    buffer = BytesIO()
+    with GzipFile(mode="wb", compresslevel=level, fileobj=buffer, mtime=0) as zfile:
+        for chunk in chunks:
+            zfile.write(chunk)
+            zfile.flush()
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Gzips the responses of `COMPRESSION_CONTENT_TYPES` longer than
+    `COMPRESSION_MIN_LENGTH` bytes, at `COMPRESSION_LEVEL`, when the client
+    accepts it. Streamed responses are compressed chunk by chunk.
+
+    Compressing a page that reflects what the visitor sent next to a secret
+    opens it to BREACH. The only secret in our pages is the CSRF token, which
+    Django masks with a new random salt on every response, so there's
+    nothing stable for an attacker to guess at.
+    """
+
+    accepts_gzip = re.compile(r"\bgzip\b")
+
+    def should_compress(self, response):
+        """
+        Is the response worth compressing?
+        """
+        if not settings.COMPRESSION_ENABLED or response.has_header("Content-Encoding"):
+            return False
+        content_type = response.get("Content-Type", "").split(";")[0].strip()
+        if content_type not in settings.COMPRESSION_CONTENT_TYPES:
+            return False
+        return (
+            response.streaming
+            or len(response.content) >= settings.COMPRESSION_MIN_LENGTH
+        )
+
+    def process_response(self, request, response):
+        if not self.should_compress(response):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        if not self.accepts_gzip.search(request.META.get("HTTP_ACCEPT_ENCODING", "")):
+            return response
+
+        level = settings.COMPRESSION_LEVEL
+        if response.streaming:
+            response.streaming_content = gzip_stream(response.streaming_content, level)
+            # The compressed length isn't known until the stream ends
+            del response["Content-Length"]
+        else:
+            compressed = gzip_bytes(response.content, level)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response["Content-Length"] = str(len(compressed))
+
+        # The compressed body differs from the one the strong ETag stands for
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        response["Content-Encoding"] = "gzip"
+        return response
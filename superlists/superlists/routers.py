@@ -0,0 +1,62 @@
+"""
+Database routers for the project
+"""
+import random
+import threading
+
+from django.conf import settings
+from django.db import connections
+
+_state = threading.local()
+
+
+def pin_to_primary(pinned):
+    """
+    Makes the reads of the current thread go to the primary database, or
+    lets them go to the replicas again
+    """
+    _state.pinned = pinned
+
+
+def is_pinned_to_primary():
+    """
+    Are the reads of the current thread pinned to the primary database?
+    """
+    return getattr(_state, "pinned", False)
+
+
+class PrimaryReplicaRouter:
+    """
+    Sends writes to the `default` database and spreads reads among the
+    aliases in `DATABASE_REPLICAS`.
+
+    Reads stay on the primary while the thread is pinned to it, so a client
+    that just wrote something can read it back before the replicas catch up,
+    and inside transactions on the primary, which must see their own writes.
+    That includes the transaction that wraps each TestCase test.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if (
+            not replicas
+            or is_pinned_to_primary()
+            or connections["default"].in_atomic_block
+        ):
+            return "default"
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {"default", *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from the primary
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
@@ -38,15 +38,18 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'lists',
+    'tasks.apps.TasksConfig',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    'superlists.middleware.CompressionMiddleware',
+    'superlists.middleware.ReplicaPinningMiddleware',
+    'superlists.anonymous.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
+    'superlists.anonymous.AuthenticationMiddleware',
+    'superlists.anonymous.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -81,6 +84,55 @@ DATABASES = {
     }
 }
 
+# Read replicas
+# Writes always go to `default`. Reads go to one of DATABASE_REPLICAS,
+# except inside transactions, in requests that write and for
+# REPLICA_PIN_SECONDS after them. To try it locally, copy db.sqlite3 and
+# point SUPERLISTS_REPLICA_DBS at the copies, separated by commas. In the
+# tests the replicas mirror `default` and only see what was committed, so the
+# reads of TestCase tests, which run in a transaction, stay on `default`.
+
+DATABASE_ROUTERS = [
+    "lists.routers.ListShardRouter",
+    "superlists.routers.PrimaryReplicaRouter",
+]
+DATABASE_REPLICAS = []
+REPLICA_PIN_SECONDS = 10
+
+for number, name in enumerate(os.environ.get("SUPERLISTS_REPLICA_DBS", "").split(",")):
+    if name:
+        alias = f"replica{number + 1}"
+        DATABASES[alias] = dict(
+            DATABASES["default"], NAME=name, TEST={"MIRROR": "default"}
+        )
+        DATABASE_REPLICAS.append(alias)
+
+# Sharding of lists
+# Each list lives in one of LIST_SHARDS, picked by a hash of its public id.
+# Ids come from a counter in LIST_ID_DATABASE, reserved LIST_ID_BLOCK_SIZE at
+# a time.
+# SUPERLISTS_SHARD_DBS adds SQLite shards, separated by commas. New shards
+# must be appended, then `manage.py migrate --database <alias>` and
+# `manage.py rebalance_shards` move lists into them.
+
+LIST_SHARDS = ["default"]
+LIST_ID_DATABASE = "default"
+LIST_ID_BLOCK_SIZE = 100
+
+for number, name in enumerate(os.environ.get("SUPERLISTS_SHARD_DBS", "").split(",")):
+    if name:
+        alias = f"shard{number + 1}"
+        DATABASES[alias] = dict(DATABASES["default"], NAME=name)
+        LIST_SHARDS.append(alias)
+
+
+# Signing in
+# Owners sign in on the page at superlists.urls, which the slim settings
+# keep, and land on their lists.
+
+LOGIN_URL = "login"
+LOGIN_REDIRECT_URL = "my_lists"
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.1/ref/settings/#auth-password-validators
@@ -120,3 +172,105 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.abspath(os.path.join(BASE_DIR, "../static"))
+
+
+# Rate limiting for the views that create lists and items
+# Each scope maps to the capacity of its buckets and how many tokens per
+# second they get back. lists.views.add_items takes a token per item. Use
+# lists.ratelimit.SQLiteBackend to share the buckets among every gunicorn
+# worker in a host. Behind nginx, set RATELIMIT_IP_HEADER to the header with
+# the client's address, as superlists.settings_slim does.
+
+RATELIMIT_ENABLED = True
+RATELIMIT_BACKEND = "lists.ratelimit.MemoryBackend"
+RATELIMIT_OPTIONS = {}
+RATELIMIT_IP_HEADER = None
+RATELIMIT_RATES = {
+    "new_list": (20, 1 / 3),
+    "new_item": (60, 1),
+    # Holds a full batch of LIST_SYNC_MAX_ITEMS
+    "add_items": (100, 1),
+}
+
+
+# Archival of abandoned lists
+# A visit is only written to List.last_accessed if the stored one is older
+# than LIST_ACCESS_RESOLUTION seconds, and the writes of each worker are
+# batched every LIST_ACCESS_FLUSH_INTERVAL seconds.
+
+LIST_ACCESS_RESOLUTION = 60 * 60
+LIST_ACCESS_FLUSH_INTERVAL = 60
+LIST_ARCHIVE_AFTER_DAYS = 90
+
+
+# Caching of list pages
+# Shared caches can keep a list page for LIST_CACHE_MAX_AGE seconds, then
+# check back with its ETag. Visits answered by a cache alone aren't recorded
+# for the archival, so keep it well below LIST_ARCHIVE_AFTER_DAYS. The ETags
+# include RELEASE, which the deploy writes to the RELEASE file, so a new
+# release isn't answered with the pages of the previous one.
+
+LIST_CACHE_MAX_AGE = 0
+
+try:
+    with open(os.path.join(BASE_DIR, "RELEASE")) as release_file:
+        RELEASE = release_file.read().strip()
+except FileNotFoundError:
+    RELEASE = "dev"
+
+
+# Offline client
+# The list pages queue new items while offline and send them in batches of
+# up to LIST_SYNC_MAX_ITEMS to lists.views.add_items.
+
+LIST_SYNC_MAX_ITEMS = 100
+
+
+# Owners of lists
+# Signed in users get their lists LIST_PAGE_SIZE at a time, most recently
+# updated first. The count of their lists is cached for
+# LIST_COUNT_CACHE_SECONDS, and dropped when one of their lists is created,
+# archived or deleted. Point CACHES at a cache the workers share, or other
+# workers show the old count until then.
+
+LIST_PAGE_SIZE = 50
+LIST_COUNT_CACHE_SECONDS = 10 * 60
+
+
+# Deletion of lists
+# lists.deletion deletes the items of a list LIST_DELETE_BATCH_SIZE at a time
+
+LIST_DELETE_BATCH_SIZE = 1000
+
+
+# Task queue
+# Tasks are queued in TASKS_DATABASE and run by the run_tasks workers, which
+# look for due tasks every TASKS_POLL_INTERVAL seconds. A failing task is
+# retried up to TASKS_MAX_ATTEMPTS times, TASKS_RETRY_BACKOFF seconds later,
+# doubling the wait every time. Workers refresh the lock of the task they run
+# every third of TASKS_LOCK_TIMEOUT. A task whose lock is older is assumed
+# lost with its worker, and runs again unless it used all its attempts.
+
+TASKS_DATABASE = "default"
+TASKS_POLL_INTERVAL = 1
+TASKS_MAX_ATTEMPTS = 5
+TASKS_RETRY_BACKOFF = 10
+TASKS_LOCK_TIMEOUT = 10 * 60
+
+
+# Compression
+# Responses of COMPRESSION_CONTENT_TYPES longer than COMPRESSION_MIN_LENGTH
+# bytes are gzipped at COMPRESSION_LEVEL by CompressionMiddleware. Shorter
+# ones gain too little to pay for it.
+
+COMPRESSION_ENABLED = True
+COMPRESSION_MIN_LENGTH = 1024
+COMPRESSION_LEVEL = 6
+COMPRESSION_CONTENT_TYPES = [
+    "text/html",
+    "text/plain",
+    "text/css",
+    "application/javascript",
+    "application/json",
+    "image/svg+xml",
+]
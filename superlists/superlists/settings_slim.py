@@ -0,0 +1,52 @@
+"""
+Settings for the workers that serve the site:
+
+    DJANGO_SETTINGS_MODULE=superlists.settings_slim gunicorn superlists.wsgi
+
+The pages of the site don't use the admin or messages, so the workers don't
+load them. They keep auth and sessions, which only run for writes and for
+signed in users, so new lists get their owner and /lists/mine works. Rate
+limits key clients on the address nginx forwards in X-Real-IP, and share
+their buckets among the workers of the host.
+Migrations, the task workers and the admin run with the full
+superlists.settings.
+
+To see what a worker loads on start, and how long it takes:
+
+    manage.py profile_startup --profile superlists.settings_slim
+"""
+# pylint: disable=wildcard-import,unused-wildcard-import
+from superlists.settings import *
+
+SLIM_APPS = [
+    "django.contrib.admin",
+    "django.contrib.messages",
+]
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in SLIM_APPS]
+
+MIDDLEWARE = [
+    middleware
+    for middleware in MIDDLEWARE
+    if not middleware.startswith(tuple(SLIM_APPS))
+    and middleware != "superlists.anonymous.MessageMiddleware"
+]
+
+# Gunicorn listens on nginx's unix socket, so REMOTE_ADDR is the same for
+# every client, and each worker would have buckets of its own
+RATELIMIT_IP_HEADER = "HTTP_X_REAL_IP"
+RATELIMIT_BACKEND = "lists.ratelimit.SQLiteBackend"
+
+OPTIONS = TEMPLATES[0]["OPTIONS"]
+TEMPLATES = [
+    dict(
+        TEMPLATES[0],
+        OPTIONS=dict(
+            OPTIONS,
+            context_processors=[
+                processor
+                for processor in OPTIONS["context_processors"]
+                if not processor.startswith(tuple(SLIM_APPS))
+            ],
+        ),
+    )
+]
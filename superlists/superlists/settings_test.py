@@ -0,0 +1,38 @@
+"""
+Settings for a fast run of the unit tests:
+
+    python manage.py test lists superlists tasks --settings=superlists.settings_test
+
+Add --parallel to spread the tests over every CPU, and --slowest N to change
+how many of the slowest tests are reported at the end.
+"""
+# pylint: disable=wildcard-import,unused-wildcard-import
+from superlists.settings import *
+
+
+class DisableMigrations:
+    """
+    Makes every app look like it has no migrations, so the test database is
+    created straight from the models
+    """
+
+    def __contains__(self, app_label):
+        return True
+
+    def __getitem__(self, app_label):
+        return None
+
+
+# A single in-memory database. Every parallel process gets its own copy
+DATABASES = {"default": {"ENGINE": "django.db.backends.sqlite3", "NAME": ":memory:"}}
+DATABASE_REPLICAS = []
+LIST_SHARDS = ["default"]
+
+MIGRATION_MODULES = DisableMigrations()
+
+PASSWORD_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+
+# The rate limiter tests turn it back on for themselves
+RATELIMIT_ENABLED = False
+
+TEST_RUNNER = "superlists.test_runner.TimedTestRunner"
@@ -0,0 +1,112 @@
+"""
+Test runner that reports the slowest tests
+"""
+import time
+import unittest
+
+from django.test.runner import (
+    DiscoverRunner,
+    ParallelTestSuite,
+    RemoteTestResult,
+    RemoteTestRunner,
+)
+
+
+class TimedTestResult(unittest.TextTestResult):
+    """
+    Test result that measures how long each test takes
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.started = None
+        self.local_durations = []
+        self.worker_durations = []
+
+    def startTest(self, test):
+        self.started = time.perf_counter()
+        super().startTest(test)
+
+    def stopTest(self, test):
+        super().stopTest(test)
+        self.local_durations.append((time.perf_counter() - self.started, test.id()))
+
+    def addWorkerDuration(self, test, duration):
+        """
+        Receives the duration measured by a parallel worker
+        """
+        self.worker_durations.append((duration, test.id()))
+
+    @property
+    def durations(self):
+        """
+        Durations of every test, slowest first
+        """
+        # In parallel runs the local events are replays, which take no time
+        return sorted(self.worker_durations or self.local_durations, reverse=True)
+
+
+class TimedRemoteTestResult(RemoteTestResult):
+    """
+    Records the duration of each test in a parallel worker, to be replayed
+    in the main process
+    """
+
+    def startTest(self, test):
+        self.started = time.perf_counter()
+        super().startTest(test)
+
+    def stopTest(self, test):
+        duration = time.perf_counter() - self.started
+        self.events.append(("addWorkerDuration", self.test_index, duration))
+        super().stopTest(test)
+
+
+class TimedRemoteTestRunner(RemoteTestRunner):
+    """
+    Runner of the parallel workers
+    """
+
+    resultclass = TimedRemoteTestResult
+
+
+class TimedParallelTestSuite(ParallelTestSuite):
+    """
+    Parallel suite whose workers time their tests
+    """
+
+    runner_class = TimedRemoteTestRunner
+
+
+class TimedTestRunner(DiscoverRunner):
+    """
+    DiscoverRunner that lists the slowest tests once they're done
+    """
+
+    parallel_test_suite = TimedParallelTestSuite
+
+    def __init__(self, slowest=10, **kwargs):
+        super().__init__(**kwargs)
+        self.slowest = slowest
+
+    @classmethod
+    def add_arguments(cls, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            "--slowest",
+            type=int,
+            default=10,
+            metavar="N",
+            help="Reports the N slowest tests. Use 0 to turn the report off.",
+        )
+
+    def get_resultclass(self):
+        return TimedTestResult
+
+    def run_suite(self, suite, **kwargs):
+        result = super().run_suite(suite, **kwargs)
+        if self.slowest:
+            result.stream.writeln(f"\nSlowest {self.slowest} tests:")
+            for duration, test_id in result.durations[: self.slowest]:
+                result.stream.writeln(f"  {duration:.3f}s {test_id}")
+        return result
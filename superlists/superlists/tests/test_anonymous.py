@@ -0,0 +1,39 @@
+"""
+Unit tests for the middleware that leave anonymous reads alone
+"""
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser, User
+
+from lists.tests.factories import EveryShardTestCase, make_list
+
+
+class AnonymousReadsTest(EveryShardTestCase):
+    """
+    Tests for the session, authentication and messages middleware
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.url = f"/lists/{make_list().public_id}/"
+
+    def test_anonymous_reads_skip_the_session(self):
+        response = self.client.get(self.url)
+        request = response.wsgi_request
+
+        self.assertFalse(hasattr(request, "session"))
+        self.assertFalse(hasattr(request, "_messages"))
+        self.assertIsInstance(request.user, AnonymousUser)
+        self.assertNotIn("Cookie", response.get("Vary", ""))
+
+    def test_writes_go_through_the_session(self):
+        response = self.client.post(self.url, data={"text": "item"})
+        self.assertTrue(hasattr(response.wsgi_request, "session"))
+
+    def test_reads_with_a_session_go_through_it(self):
+        user = User.objects.create_user("someone", password="secret")
+        self.client.force_login(user)
+
+        response = self.client.get(self.url)
+
+        self.assertIn(settings.SESSION_COOKIE_NAME, response.wsgi_request.COOKIES)
+        self.assertEqual(response.wsgi_request.user, user)
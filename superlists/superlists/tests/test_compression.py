@@ -0,0 +1,73 @@
+"""
+Unit tests for the compression of responses
+"""
+import gzip
+import zlib
+
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, override_settings
+
+from lists.tests.factories import EveryShardTestCase, make_list
+from superlists.middleware import CompressionMiddleware
+
+PAGE = b"<p>To-Do</p>" * 200
+
+
+class CompressionMiddlewareTest(EveryShardTestCase):
+    """
+    Tests for CompressionMiddleware
+    """
+
+    def process(self, response, accept="gzip, deflate"):
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING=accept)
+        middleware = CompressionMiddleware(lambda request: response)
+        return middleware(request)
+
+    def test_compresses_long_pages(self):
+        response = self.process(HttpResponse(PAGE))
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+        self.assertEqual(gzip.decompress(response.content), PAGE)
+        self.assertEqual(response["Content-Length"], str(len(response.content)))
+
+    def test_leaves_short_pages_alone(self):
+        response = self.process(HttpResponse(b"<p>short</p>"))
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+    def test_leaves_other_content_types_alone(self):
+        response = self.process(HttpResponse(PAGE, content_type="image/png"))
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+    def test_only_compresses_for_clients_that_accept_it(self):
+        response = self.process(HttpResponse(PAGE), accept="identity")
+
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+
+    @override_settings(COMPRESSION_ENABLED=False)
+    def test_can_be_turned_off(self):
+        response = self.process(HttpResponse(PAGE))
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+    def test_streams_each_chunk(self):
+        chunks = [b"<p>first</p>", b"<p>second</p>"]
+        response = self.process(StreamingHttpResponse(iter(chunks)))
+
+        stream = iter(response.streaming_content)
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        # Each chunk can be read before the next one is produced
+        self.assertEqual(decompressor.decompress(next(stream)), chunks[0])
+        self.assertEqual(decompressor.decompress(next(stream)), chunks[1])
+        self.assertEqual(decompressor.decompress(b"".join(stream)), b"")
+        self.assertTrue(decompressor.eof)
+
+    def test_list_pages_are_compressed(self):
+        list_ = make_list(*[f"item {number}" for number in range(100)])
+
+        response = self.client.get(
+            f"/lists/{list_.public_id}/", HTTP_ACCEPT_ENCODING="gzip"
+        )
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertIn(b"99: item 98", gzip.decompress(response.content))
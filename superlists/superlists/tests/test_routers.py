@@ -0,0 +1,129 @@
+"""
+Unit tests for the read replica routing
+"""
+from unittest import skipUnless
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+
+from lists.models import List
+from superlists.middleware import PIN_COOKIE, ReplicaPinningMiddleware
+from superlists.routers import (
+    PrimaryReplicaRouter,
+    is_pinned_to_primary,
+    pin_to_primary,
+)
+
+
+@override_settings(DATABASE_REPLICAS=["replica1", "replica2"])
+class PrimaryReplicaRouterTest(SimpleTestCase):
+    """
+    Tests for the decisions of the router
+    """
+
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+        self.addCleanup(pin_to_primary, False)
+
+    def test_reads_go_to_a_replica(self):
+        self.assertIn(self.router.db_for_read(List), ["replica1", "replica2"])
+
+    def test_writes_go_to_the_primary(self):
+        self.assertEqual(self.router.db_for_write(List), "default")
+
+    def test_pinned_reads_go_to_the_primary(self):
+        pin_to_primary(True)
+        self.assertEqual(self.router.db_for_read(List), "default")
+
+    def test_replicas_are_not_migrated(self):
+        self.assertFalse(self.router.allow_migrate("replica1", "lists"))
+        self.assertIsNone(self.router.allow_migrate("default", "lists"))
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_reads_go_to_the_primary_without_replicas(self):
+        self.assertEqual(self.router.db_for_read(List), "default")
+
+
+@override_settings(DATABASE_REPLICAS=["replica1", "replica2"])
+class TransactionRoutingTest(TestCase):
+    """
+    Each TestCase test runs in a transaction on the primary
+    """
+
+    def test_reads_in_a_transaction_go_to_the_primary(self):
+        self.assertEqual(PrimaryReplicaRouter().db_for_read(List), "default")
+
+
+@override_settings(DATABASE_REPLICAS=["replica1"], REPLICA_PIN_SECONDS=5)
+class ReplicaPinningMiddlewareTest(TestCase):
+    """
+    Tests for the read-your-writes pinning
+    """
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.seen_pinned = None
+
+        def view(request):  # pylint: disable=unused-argument
+            self.seen_pinned = is_pinned_to_primary()
+            return HttpResponse()
+
+        self.middleware = ReplicaPinningMiddleware(view)
+
+    def test_posts_are_pinned_and_pin_what_follows(self):
+        response = self.middleware(self.factory.post("/lists/new"))
+
+        self.assertTrue(self.seen_pinned)
+        self.assertEqual(response.cookies[PIN_COOKIE]["max-age"], 5)
+        # The pin doesn't leak into the next request of the thread
+        self.assertFalse(is_pinned_to_primary())
+
+    def test_gets_are_not_pinned(self):
+        response = self.middleware(self.factory.get("/"))
+        self.assertFalse(self.seen_pinned)
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_gets_after_a_write_are_pinned(self):
+        request = self.factory.get("/")
+        request.COOKIES[PIN_COOKIE] = "1"
+        self.middleware(request)
+        self.assertTrue(self.seen_pinned)
+
+
+@skipUnless(settings.DATABASE_REPLICAS, "Set SUPERLISTS_REPLICA_DBS to run")
+class ReplicaRoutingTest(TransactionTestCase):
+    """
+    Tests the routing against real databases. Run them with
+
+        SUPERLISTS_REPLICA_DBS=/tmp/replica.sqlite3 \\
+            python manage.py test superlists.tests.test_routers
+
+    The replicas mirror the test database, so they see every write at once.
+    """
+
+    databases = "__all__"
+
+    def test_list_pages_are_read_from_a_replica(self):
+        list_ = List.objects.create()
+        with CaptureQueriesContext(connections["default"]) as primary:
+            self.client.get(f"/lists/{list_.public_id}/")
+        self.assertEqual(len(primary), 0)
+
+    def test_redirect_after_a_post_reads_from_the_primary(self):
+        list_ = List.objects.create()
+        replica = connections[settings.DATABASE_REPLICAS[0]]
+        with CaptureQueriesContext(replica) as replica_queries:
+            response = self.client.post(
+                f"/lists/{list_.public_id}/", data={"text": "Fresh item"}, follow=True
+            )
+        self.assertContains(response, "1: Fresh item")
+        self.assertEqual(len(replica_queries), 0)
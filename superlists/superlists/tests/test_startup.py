@@ -0,0 +1,70 @@
+"""
+Unit tests for the start up profile of the workers
+"""
+from django.test import SimpleTestCase
+
+from lists.management.commands.profile_startup import owner, parse_importtime
+from superlists import settings_slim
+
+IMPORTTIME = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   django.utils.version
+import time:       300 |        420 | django
+import time:        80 |         80 | django.contrib.admin.options
+"""
+
+
+class ProfileStartupTest(SimpleTestCase):
+    """
+    Tests for the parsing done by the profile_startup command
+    """
+
+    def test_parses_importtime_output(self):
+        self.assertEqual(
+            parse_importtime(IMPORTTIME),
+            {
+                "django.utils.version": (120, 120),
+                "django": (300, 420),
+                "django.contrib.admin.options": (80, 80),
+            },
+        )
+
+    def test_modules_belong_to_the_longest_matching_app(self):
+        packages = ["django.contrib.admin", "lists"]
+        self.assertEqual(
+            owner("django.contrib.admin.options", packages), "django.contrib.admin"
+        )
+        self.assertEqual(owner("lists", packages), "lists")
+        self.assertEqual(owner("django.utils.version", packages), "django")
+
+
+class SlimSettingsTest(SimpleTestCase):
+    """
+    Tests for the settings of the web workers
+    """
+
+    def test_leaves_out_the_unused_apps(self):
+        for app in settings_slim.SLIM_APPS:
+            self.assertNotIn(app, settings_slim.INSTALLED_APPS)
+            for middleware in settings_slim.MIDDLEWARE:
+                self.assertFalse(middleware.startswith(app))
+        self.assertNotIn(
+            "superlists.anonymous.MessageMiddleware", settings_slim.MIDDLEWARE
+        )
+        self.assertIn("lists", settings_slim.INSTALLED_APPS)
+
+    def test_keeps_users_for_the_owners_of_lists(self):
+        self.assertIn("django.contrib.auth", settings_slim.INSTALLED_APPS)
+        self.assertIn("django.contrib.sessions", settings_slim.INSTALLED_APPS)
+        self.assertIn(
+            "superlists.anonymous.SessionMiddleware", settings_slim.MIDDLEWARE
+        )
+        self.assertIn(
+            "superlists.anonymous.AuthenticationMiddleware", settings_slim.MIDDLEWARE
+        )
+
+    def test_keeps_the_full_settings_untouched(self):
+        from superlists import settings
+
+        processors = settings.TEMPLATES[0]["OPTIONS"]["context_processors"]
+        self.assertIn("django.contrib.auth.context_processors.auth", processors)
@@ -13,12 +13,29 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
+from django.contrib.auth import views as auth_views
 from django.urls import include, path
 
 from lists import urls as list_urls
 from lists.views import home_page as lists_home
+from lists.views import service_worker
 
 urlpatterns = [
     path("", lists_home, name="home"),
-    path("lists/", include(list_urls))
+    path("lists/", include(list_urls)),
+    path("sw.js", service_worker, name="service_worker"),
+    # Where /lists/mine sends visitors who aren't signed in. The workers
+    # have no admin, so its login page can't be used
+    path(
+        "accounts/login/",
+        auth_views.LoginView.as_view(template_name="login.html"),
+        name="login",
+    ),
 ]
+
+# The slim settings of the workers leave the admin out
+if "django.contrib.admin" in settings.INSTALLED_APPS:
+    from django.contrib import admin
+
+    urlpatterns.append(path("admin/", admin.site.urls))
@@ -0,0 +1,42 @@
+"""
+Runs the queued tasks
+"""
+import signal
+
+from django.core.management.base import BaseCommand
+
+from tasks.queue import Worker
+
+
+class Command(BaseCommand):
+    """
+    run_tasks starts a worker. Start as many as needed, they share the queue
+    """
+
+    help = "Runs the tasks in the queue until stopped"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--burst",
+            action="store_true",
+            help="Stop once there are no tasks due",
+        )
+        parser.add_argument(
+            "--max-tasks",
+            type=int,
+            default=None,
+            help="Stop after running this many tasks",
+        )
+
+    def handle(self, *args, **options):
+        worker = Worker()
+
+        def stop(signum, frame):  # pylint: disable=unused-argument
+            # Finishes the running task first
+            worker.stopping = True
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        ran = worker.work(burst=options["burst"], max_tasks=options["max_tasks"])
+        self.stdout.write(f"Worker {worker.name} ran {ran} tasks")
@@ -0,0 +1,36 @@
+"""
+Data models for the Tasks app
+"""
+from django.db import models
+from django.utils import timezone
+
+
+class Task(models.Model):
+    """
+    A call to a registered task, waiting in the queue or running. Tasks
+    are deleted once they succeed, so the table only holds pending work and
+    the tasks that failed for good.
+    """
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    FAILED = "failed"
+    STATUSES = [(QUEUED, "Queued"), (RUNNING, "Running"), (FAILED, "Failed")]
+
+    name = models.CharField(max_length=200)
+    # JSON with the "args" and "kwargs" of the call
+    arguments = models.TextField(default="{}")
+    status = models.CharField(max_length=10, choices=STATUSES, default=QUEUED)
+    run_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField()
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "run_at"])]
+
+    def __str__(self):
+        return f"{self.name} ({self.status})"
@@ -0,0 +1,278 @@
+"""
+A task queue that lives in the database, so it needs no broker.
+
+Decorate a function in the `tasks` module of an app with `@task` to register
+it, then queue calls to it with `enqueue`:
+
+    @task
+    def restore_list(public_id):
+        ...
+
+    restore_list.enqueue(list_.public_id)
+
+`enqueue_once` does the same unless an identical call is already queued or
+running, for work that's asked for again until it's done. The arguments
+must be JSON serializable. Queued calls are rows of Task in
+`TASKS_DATABASE`, so a task queued inside a transaction is only seen by the
+workers if the transaction commits.
+
+Workers are started with the `run_tasks` command, as many as needed, on any
+host. Each one claims a due task at a time. Where the database supports it,
+with SELECT ... FOR UPDATE SKIP LOCKED, elsewhere with a conditional UPDATE
+that only one worker can win. Tasks that raise are retried up to their
+`max_attempts`, waiting `TASKS_RETRY_BACKOFF` seconds the first time and
+twice as long after each attempt. While a task runs, its worker refreshes
+the lock every third of `TASKS_LOCK_TIMEOUT`. A task whose lock is older
+than that lost its worker, and is taken over by another one, or given up
+on once it used all its attempts, since it may be what killed the workers.
+"""
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from tasks.models import Task
+
+logger = logging.getLogger(__name__)
+
+registry = {}
+
+# How many due tasks a worker tries to win when it can't use SKIP LOCKED
+CLAIM_CANDIDATES = 10
+
+
+def task(func=None, *, name=None, max_attempts=None):
+    """
+    Registers `func` as a task, under `name` or its dotted path, and gives
+    it an `enqueue` method
+    """
+
+    def register(func):
+        func.task_name = name or f"{func.__module__}.{func.__name__}"
+        func.max_attempts = max_attempts or settings.TASKS_MAX_ATTEMPTS
+        func.enqueue = partial(enqueue, func)
+        func.enqueue_once = partial(enqueue_once, func)
+        registry[func.task_name] = func
+        return func
+
+    if func is None:
+        return register
+    return register(func)
+
+
+def enqueue(func, *args, run_at=None, **kwargs):
+    """
+    Queues a call to the task `func`, to run as soon as possible or at
+    `run_at`. Returns the Task.
+    """
+    return Task.objects.using(settings.TASKS_DATABASE).create(
+        name=func.task_name,
+        arguments=json.dumps({"args": args, "kwargs": kwargs}),
+        run_at=run_at or timezone.now(),
+        max_attempts=func.max_attempts,
+    )
+
+
+def enqueue_once(func, *args, **kwargs):
+    """
+    Queues a call to the task `func` like enqueue, unless the same call is
+    already queued or running. Returns the new Task or the pending one.
+    """
+    pending = Task.objects.using(settings.TASKS_DATABASE).filter(
+        name=func.task_name,
+        arguments=json.dumps({"args": args, "kwargs": kwargs}),
+        status__in=[Task.QUEUED, Task.RUNNING],
+    )
+    return pending.first() or enqueue(func, *args, **kwargs)
+
+
+def retry_delay(attempts):
+    """
+    Returns how many seconds to wait before retrying a task that failed
+    `attempts` times
+    """
+    return settings.TASKS_RETRY_BACKOFF * 2 ** (attempts - 1)
+
+
+class Heartbeat(threading.Thread):
+    """
+    Refreshes the lock of a running task until stopped, so tasks that run
+    longer than `TASKS_LOCK_TIMEOUT` aren't taken over
+    """
+
+    def __init__(self, claimed):
+        super().__init__(name=f"heartbeat of task {claimed.id}", daemon=True)
+        self.claimed = claimed
+        self.stopped = threading.Event()
+
+    def run(self):
+        interval = settings.TASKS_LOCK_TIMEOUT / 3
+        tasks = Task.objects.using(settings.TASKS_DATABASE).filter(
+            id=self.claimed.id, locked_by=self.claimed.locked_by
+        )
+        try:
+            while not self.stopped.wait(interval):
+                try:
+                    tasks.update(locked_at=timezone.now())
+                except Exception:  # pylint: disable=broad-except
+                    logger.exception("Could not refresh the lock of a task")
+        finally:
+            # The thread has connections of its own
+            connections.close_all()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+class Worker:
+    """
+    Claims due tasks from the queue and runs them
+    """
+
+    def __init__(self, name=None):
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.stopping = False
+        # Registers the tasks in the tasks module of every app. Only workers
+        # need all of them, so the web workers don't import them on start
+        autodiscover_modules("tasks")
+
+    @property
+    def tasks(self):
+        return Task.objects.using(settings.TASKS_DATABASE)
+
+    def lost_tasks(self, now):
+        stale = now - timedelta(seconds=settings.TASKS_LOCK_TIMEOUT)
+        return self.tasks.filter(status=Task.RUNNING, locked_at__lt=stale)
+
+    def due_tasks(self, now):
+        lost = self.lost_tasks(now).filter(attempts__lt=F("max_attempts"))
+        return (self.tasks.filter(status=Task.QUEUED, run_at__lte=now) | lost).order_by(
+            "run_at"
+        )
+
+    def give_up_lost_tasks(self, now):
+        """
+        Fails the lost tasks that used all their attempts. Their workers
+        never got to fail them.
+        """
+        return (
+            self.lost_tasks(now)
+            .filter(attempts__gte=F("max_attempts"))
+            .update(
+                status=Task.FAILED,
+                last_error="Its worker stopped while running it",
+                locked_by="",
+                locked_at=None,
+            )
+        )
+
+    def claim(self):
+        """
+        Locks the next due task for this worker. Returns it, or None when
+        there's nothing to do.
+        """
+        now = timezone.now()
+        self.give_up_lost_tasks(now)
+        due = self.due_tasks(now)
+        claimed = None
+
+        database = settings.TASKS_DATABASE
+        if connections[database].features.has_select_for_update_skip_locked:
+            with transaction.atomic(using=database):
+                claimed = due.select_for_update(skip_locked=True).first()
+                if claimed is not None:
+                    self._lock(self.tasks.filter(id=claimed.id), now)
+        else:
+            for candidate in due[:CLAIM_CANDIDATES]:
+                # Only one worker sees the task as it was when it was read
+                won = self.tasks.filter(
+                    id=candidate.id,
+                    status=candidate.status,
+                    locked_at=candidate.locked_at,
+                )
+                if self._lock(won, now):
+                    claimed = candidate
+                    break
+
+        if claimed is not None:
+            claimed.status = Task.RUNNING
+            claimed.locked_by = self.name
+            claimed.locked_at = now
+            claimed.attempts += 1
+        return claimed
+
+    def _lock(self, tasks, now):
+        return tasks.update(
+            status=Task.RUNNING,
+            locked_by=self.name,
+            locked_at=now,
+            attempts=F("attempts") + 1,
+        )
+
+    def run(self, claimed):
+        """
+        Runs a claimed task. Returns whether it succeeded.
+        """
+        heartbeat = Heartbeat(claimed)
+        heartbeat.start()
+        try:
+            func = registry.get(claimed.name)
+            if func is None:
+                raise LookupError(f"There is no task named {claimed.name}")
+            arguments = json.loads(claimed.arguments)
+            func(*arguments["args"], **arguments["kwargs"])
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("Task %s failed", claimed.name)
+            self.fail(claimed, traceback.format_exc())
+            return False
+        finally:
+            heartbeat.stop()
+
+        self.tasks.filter(id=claimed.id).delete()
+        return True
+
+    def fail(self, claimed, error):
+        """
+        Queues a failed task again, later, or gives up on it
+        """
+        if claimed.attempts >= claimed.max_attempts:
+            status, run_at = Task.FAILED, claimed.run_at
+        else:
+            status = Task.QUEUED
+            run_at = timezone.now() + timedelta(seconds=retry_delay(claimed.attempts))
+        self.tasks.filter(id=claimed.id).update(
+            status=status, run_at=run_at, last_error=error, locked_by="", locked_at=None
+        )
+
+    def work(self, burst=False, max_tasks=None):
+        """
+        Runs tasks until stopped, or until the queue is empty when `burst`
+        is set. Returns how many tasks ran.
+        """
+        ran = 0
+        while not self.stopping and (max_tasks is None or ran < max_tasks):
+            # Like a request, each task gets healthy database connections
+            close_old_connections()
+            claimed = self.claim()
+            if claimed is None:
+                if burst:
+                    break
+                time.sleep(settings.TASKS_POLL_INTERVAL)
+                continue
+
+            self.run(claimed)
+            ran += 1
+        close_old_connections()
+        return ran
@@ -0,0 +1,186 @@
+"""
+Unit tests for the task queue
+"""
+import time
+from datetime import timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from tasks.models import Task
+from tasks.queue import Worker, registry, retry_delay, task
+
+calls = []
+
+
+@task(name="tests.record")
+def record(*args, **kwargs):
+    calls.append((args, kwargs))
+
+
+@task(name="tests.explode", max_attempts=2)
+def explode():
+    raise RuntimeError("boom")
+
+
+@task(name="tests.outlive_the_lock")
+def outlive_the_lock(seconds):
+    claimed = Task.objects.get(name="tests.outlive_the_lock")
+    time.sleep(seconds)
+    claimed.refresh_from_db()
+    calls.append(claimed.locked_at)
+
+
+class QueueTest(TestCase):
+    """
+    Tests for queueing and running tasks
+    """
+
+    def setUp(self):
+        calls.clear()
+
+    def test_registers_tasks(self):
+        self.assertIs(registry["tests.record"], record)
+
+    def test_runs_queued_tasks_once(self):
+        record.enqueue(1, "two", three=3)
+
+        self.assertEqual(Worker().work(burst=True), 1)
+
+        self.assertEqual(calls, [((1, "two"), {"three": 3})])
+        self.assertEqual(Task.objects.count(), 0)
+
+    def test_enqueue_once_skips_pending_calls(self):
+        first = record.enqueue_once(1)
+        self.assertEqual(record.enqueue_once(1), first)
+        record.enqueue_once(2)
+        self.assertEqual(Task.objects.count(), 2)
+
+        # Once the call ran, it can be queued again
+        Worker().work(burst=True)
+        record.enqueue_once(1)
+        self.assertEqual(Task.objects.count(), 1)
+
+    def test_tasks_wait_for_their_time(self):
+        record.enqueue(run_at=timezone.now() + timedelta(hours=1))
+
+        self.assertEqual(Worker().work(burst=True), 0)
+        self.assertEqual(calls, [])
+
+    @override_settings(TASKS_RETRY_BACKOFF=10)
+    def test_failed_tasks_are_retried_later(self):
+        queued = explode.enqueue()
+        with self.assertLogs("tasks.queue", "ERROR"):
+            Worker().work(burst=True)
+
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, Task.QUEUED)
+        self.assertEqual(queued.attempts, 1)
+        self.assertIn("RuntimeError: boom", queued.last_error)
+        self.assertGreater(queued.run_at, timezone.now() + timedelta(seconds=5))
+
+    def test_tasks_fail_for_good_after_their_attempts(self):
+        queued = explode.enqueue()
+        Task.objects.filter(id=queued.id).update(attempts=1)
+
+        with self.assertLogs("tasks.queue", "ERROR"):
+            Worker().work(burst=True)
+
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, Task.FAILED)
+
+    def test_unknown_tasks_fail(self):
+        Task.objects.create(name="tests.missing", max_attempts=1)
+        with self.assertLogs("tasks.queue", "ERROR"):
+            Worker().work(burst=True)
+        self.assertIn("no task named tests.missing", Task.objects.get().last_error)
+
+    @override_settings(TASKS_RETRY_BACKOFF=10)
+    def test_retry_delay_doubles(self):
+        self.assertEqual([retry_delay(n) for n in (1, 2, 3)], [10, 20, 40])
+
+
+class ClaimTest(TestCase):
+    """
+    Tests for how workers share the queue
+    """
+
+    def test_a_task_is_claimed_by_one_worker(self):
+        record.enqueue()
+        first, second = Worker("first"), Worker("second")
+
+        claimed = first.claim()
+
+        self.assertEqual(claimed.locked_by, "first")
+        self.assertIsNone(second.claim())
+
+    @override_settings(TASKS_LOCK_TIMEOUT=60)
+    def test_tasks_of_lost_workers_are_taken_over(self):
+        queued = record.enqueue()
+        Task.objects.filter(id=queued.id).update(
+            status=Task.RUNNING,
+            locked_by="lost",
+            locked_at=timezone.now() - timedelta(minutes=5),
+        )
+
+        claimed = Worker("second").claim()
+
+        self.assertEqual(claimed.id, queued.id)
+        self.assertEqual(Task.objects.get().locked_by, "second")
+
+    @override_settings(TASKS_LOCK_TIMEOUT=60)
+    def test_lost_tasks_without_attempts_left_fail(self):
+        # The task killed every worker that ran it
+        queued = record.enqueue()
+        Task.objects.filter(id=queued.id).update(
+            status=Task.RUNNING,
+            locked_by="lost",
+            locked_at=timezone.now() - timedelta(minutes=5),
+            attempts=queued.max_attempts,
+        )
+
+        self.assertIsNone(Worker("second").claim())
+
+        lost = Task.objects.get()
+        self.assertEqual(lost.status, Task.FAILED)
+        self.assertIn("worker stopped", lost.last_error)
+
+
+class HeartbeatTest(TransactionTestCase):
+    """
+    Tests for the locks of tasks that run for long
+    """
+
+    # Reads outside of transactions go to the replicas
+    databases = {"default", *settings.DATABASE_REPLICAS}
+
+    def setUp(self):
+        calls.clear()
+
+    @override_settings(TASKS_LOCK_TIMEOUT=0.3)
+    def test_running_tasks_keep_their_lock(self):
+        outlive_the_lock.enqueue(0.5)
+        started = timezone.now()
+
+        Worker().work(burst=True)
+
+        # Refreshed while the task ran, so no other worker took it over
+        self.assertGreater(calls[0], started + timedelta(seconds=0.1))
+
+
+class RunTasksCommandTest(TestCase):
+    """
+    Tests for the run_tasks command
+    """
+
+    def test_burst(self):
+        record.enqueue()
+        record.enqueue()
+        output = StringIO()
+
+        call_command("run_tasks", burst=True, stdout=output)
+
+        self.assertIn("ran 2 tasks", output.getvalue())